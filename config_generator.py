@@ -6,11 +6,24 @@ config = {
     "cs2_executable": "D:\\SteamLibrary\\steamapps\\common\\Counter-Strike Global Offensive\\game\\bin\\win64\\cs2.exe",
     "steam_executable": "C:\\Program Files (x86)\\Steam\\steam.exe",
     "server_cycle_delay": 5,  # seconds between server cycles
+    "cycle_restart_delay": 10,  # seconds before the preferred list is cycled again
     "match_timeout": 180,  # seconds to wait for a match
     "wait_between_clicks": 1500,  # milliseconds to wait between UI interactions
     "max_wait_for_match": 120,  # seconds to wait for match to start
     "color_tolerance": 20,  # tolerance for color matching
-    
+
+    # Async manager core
+    "fetch_timeout": 30,  # seconds to wait for the Steam API
+    "command_timeout": 30,  # seconds to wait for a single netsh call
+    "ahk_timeout": 600,  # seconds before the AHK script is killed
+    "firewall_concurrency": 4,  # netsh calls allowed to run at once
+    "sdr_refresh_interval": 300,  # seconds before server data is re-fetched during a cycle
+    "sdr_snapshot_url": "",  # e.g. "http://192.168.1.10:8730" to share one SDR fetch across machines
+    "landing_detection": False,  # confirm the landed POP from the OS connection table
+    "landing_poll_interval": 0.25,  # seconds between connection-table samples
+    "landing_early_exit": False,  # stop the AHK script once the landing on the expected POP is confirmed
+    "export_servers_json": False,  # also write all_servers.json on every server data change
+
     # Updated UI coordinates for the CS2 interface
     "play_button_x": 985,
     "play_button_y": 30,
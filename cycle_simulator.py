@@ -0,0 +1,501 @@
+import asyncio
+import json
+import os
+import random
+import re
+import selectors
+import statistics
+import subprocess
+import sys
+import time
+import logging
+from datetime import datetime
+
+from server_manager import CS2ServerManager, DEFAULT_CONFIG, data_directory, log_directory
+from server_snapshot import ServerSnapshot
+
+# Policy knobs the simulator can vary: config keys the manager reads, passed to the real
+# manager unchanged (ahk_timeout bounds a whole automation run, after which the manager
+# kills the script). firewall_concurrency only matters when the simulated firewall can
+# serve more than one netsh call at a time (see CycleSimulator's firewall_parallel_calls).
+MANAGER_POLICY_KEYS = ("server_cycle_delay", "cycle_restart_delay", "ahk_timeout", "firewall_concurrency")
+DEFAULT_POLICY = {key: DEFAULT_CONFIG[key] for key in MANAGER_POLICY_KEYS}
+
+# WaitForMatchOutcome in CS2_Matchmaking.ahk gives up after a fixed 180 seconds. It is not
+# a config setting, so it is part of the model rather than a policy knob.
+MATCH_OUTCOME_TIMEOUT = 180
+
+AUTOMATION_LOG_RE = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) - (.*)$")
+SERVER_NAME_RE = re.compile(r"^(.*) \(([^()]+)\)$")
+MANAGER_LOG_RE = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d{3}) - \w+ - (.*)$")
+
+
+class VirtualClockSelector(selectors.SelectSelector):
+    """Selector that jumps the loop's virtual clock instead of sleeping.
+
+    The simulation never waits on real file descriptors or threads, so the
+    loop's self-pipe is never polled and no select() syscall is made.
+    """
+
+    def __init__(self, loop):
+        super().__init__()
+        self.loop = loop
+
+    def select(self, timeout=None):
+        if timeout is None:
+            raise RuntimeError("Simulation deadlocked: nothing is scheduled")
+        self.loop.virtual_time += timeout
+        return []
+
+
+class VirtualClockEventLoop(asyncio.SelectorEventLoop):
+    """Event loop whose time() is virtual, so asyncio.sleep and timeouts cost no real time"""
+
+    def __init__(self):
+        self.virtual_time = 0.0
+        super().__init__(VirtualClockSelector(self))
+
+    def time(self):
+        return self.virtual_time
+
+
+class SimulatedFirewall:
+    """In-memory stand-in for netsh advfirewall rules"""
+
+    def __init__(self, rng, call_latency=0.12, latency_jitter=0.02, parallel_calls=1):
+        self.rng = rng
+        self.call_latency = call_latency
+        self.latency_jitter = latency_jitter
+        self.calls = 0
+        self.rules = {}
+        # Virtual time at which each of the parallel_calls netsh "slots" becomes free
+        self.slots = [0.0] * parallel_calls
+
+    async def run(self, args):
+        """Execute a netsh argument list and return (returncode, stdout)"""
+        self.calls += 1
+        now = asyncio.get_running_loop().time()
+        slot = min(range(len(self.slots)), key=self.slots.__getitem__)
+        finish = max(now, self.slots[slot]) + max(0.0, self.rng.gauss(self.call_latency, self.latency_jitter))
+        self.slots[slot] = finish
+        await asyncio.sleep(finish - now)
+
+        action = args[2]
+        rule_name = next(arg[5:] for arg in args if arg.startswith("name="))
+        if action == "show":
+            if rule_name in self.rules:
+                return 0, f"Rule Name: {rule_name}\nOk.\n"
+            return 1, "No rules match the specified criteria.\n"
+        if action == "add":
+            self.rules[rule_name] = next(arg[9:] for arg in args if arg.startswith("remoteip="))
+            return 0, "Ok.\n"
+        if action == "delete":
+            if self.rules.pop(rule_name, None) is None:
+                return 1, "No rules match the specified criteria.\n"
+            return 0, "Ok.\n"
+        return 1, f"Unsupported netsh action: {action}\n"
+
+
+class MatchmakingModel:
+    """Stochastic model of one automation run, with optional per-POP overrides.
+
+    A run spends ui_overhead seconds navigating menus, then waits for an outcome:
+    with probability success_rate a match is found after an exponentially
+    distributed search time, otherwise the failure dialog appears. Either outcome
+    turns into a timeout once outcome_timeout is exceeded. After the outcome
+    the script spends match_duration (success) or recovery_time (failure) before
+    it exits.
+    """
+
+    def __init__(self, success_rate=0.5, mean_match_time=60.0, mean_failure_time=10.0,
+                 ui_overhead=15.0, recovery_time=8.0, match_duration=30.0, pops=None):
+        self.success_rate = success_rate
+        self.mean_match_time = mean_match_time
+        self.mean_failure_time = mean_failure_time
+        self.ui_overhead = ui_overhead
+        self.recovery_time = recovery_time
+        self.match_duration = match_duration
+        self.pops = pops or {}
+
+    def pop_param(self, pop, name):
+        return self.pops.get(pop, {}).get(name, getattr(self, name))
+
+    def sample(self, rng, pop, outcome_timeout=MATCH_OUTCOME_TIMEOUT):
+        """Return (outcome, seconds until outcome, total run seconds)"""
+        if pop is None:
+            wait, outcome = rng.expovariate(1 / self.mean_failure_time), "failure"
+        elif rng.random() < self.pop_param(pop, "success_rate"):
+            wait, outcome = rng.expovariate(1 / self.pop_param(pop, "mean_match_time")), "success"
+        else:
+            wait, outcome = rng.expovariate(1 / self.pop_param(pop, "mean_failure_time")), "failure"
+
+        if wait > outcome_timeout:
+            wait, outcome = outcome_timeout, "timeout"
+
+        tail = self.match_duration if outcome == "success" else self.recovery_time
+        return outcome, self.ui_overhead + wait, self.ui_overhead + wait + tail
+
+    def to_dict(self):
+        return {
+            "success_rate": self.success_rate,
+            "mean_match_time": self.mean_match_time,
+            "mean_failure_time": self.mean_failure_time,
+            "ui_overhead": self.ui_overhead,
+            "recovery_time": self.recovery_time,
+            "match_duration": self.match_duration,
+            "pops": self.pops,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class SimulatedServerManager(CS2ServerManager):
+    """The real manager, with its subprocess and network calls routed into the simulation"""
+
+    def __init__(self, servers_data, preferred_servers, policy, firewall, model, rng):
+        config = {key: policy[key] for key in MANAGER_POLICY_KEYS}
+        config["sdr_refresh_interval"] = 0
+        super().__init__(config=config)
+        self.all_servers_file = None
+        self.server_snapshot_file = None
+        self.preferred_servers = list(preferred_servers)
+        # Rebuild a GetSDRConfig response so parse_sdr_config reproduces the same names
+        self.sdr_config = {"pops": {}}
+        for index, (name, ips) in enumerate(servers_data.items()):
+            match = SERVER_NAME_RE.match(name)
+            desc, code = match.groups() if match else (name, f"sim{index}")
+            self.sdr_config["pops"][code] = {"desc": desc, "relays": [{"ipv4": ip} for ip in ips.split(",")]}
+        self.policy = policy
+        self.firewall = firewall
+        self.model = model
+        self.rng = rng
+        self.attempts = []
+        self.firewall_time = 0.0
+
+    async def _fetch_sdr_config_async(self):
+        return self.sdr_config
+
+    async def _run_command_async(self, cmd, timeout=None):
+        if cmd[0] == self.netsh_path:
+            # Simulated netsh calls always finish well inside command_timeout
+            returncode, stdout = await self.firewall.run(cmd[1:])
+            return subprocess.CompletedProcess(cmd, returncode, stdout, "")
+        return await asyncio.wait_for(self._simulate_automation(cmd), timeout)
+
+    async def _simulate_automation(self, cmd):
+        """Play one automation run against whichever POPs the firewall leaves open"""
+        loop = asyncio.get_running_loop()
+        open_pops = [
+            name for name in self.servers_data
+            if self._rule_name(name) not in self.firewall.rules
+        ]
+        pop = self.rng.choice(open_pops) if open_pops else None
+        outcome, outcome_after, duration = self.model.sample(self.rng, pop)
+        attempt = {"pop": pop, "start": loop.time(), "outcome": outcome, "outcome_after": outcome_after}
+        self.attempts.append(attempt)
+        try:
+            await asyncio.sleep(duration)
+        except asyncio.CancelledError:
+            # Killed by the manager before the script reached its outcome
+            if loop.time() - attempt["start"] < outcome_after:
+                attempt["outcome"] = "killed"
+            raise
+        finally:
+            attempt["duration"] = loop.time() - attempt["start"]
+        return subprocess.CompletedProcess(cmd, 0, "", "")
+
+    async def block_all_except_async(self, exception_server_name):
+        start = asyncio.get_running_loop().time()
+        try:
+            return await super().block_all_except_async(exception_server_name)
+        finally:
+            self.firewall_time += asyncio.get_running_loop().time() - start
+
+    async def apply_transition_async(self, plan):
+        start = asyncio.get_running_loop().time()
+        try:
+            return await super().apply_transition_async(plan)
+        finally:
+            self.firewall_time += asyncio.get_running_loop().time() - start
+
+
+class CycleSimulator:
+    """Runs the real manager against a simulated firewall and matchmaking model.
+
+    firewall_parallel_calls is how many netsh calls the firewall service completes at
+    once. The default of 1 assumes it serializes them, in which case the manager's
+    firewall_concurrency makes no difference.
+    """
+
+    def __init__(self, servers_data, preferred_servers, model=None, firewall_latency=0.12, seed=None,
+                 firewall_parallel_calls=1):
+        self.servers_data = servers_data
+        self.preferred_servers = preferred_servers
+        self.model = model or MatchmakingModel()
+        self.firewall_latency = firewall_latency
+        self.firewall_parallel_calls = max(1, firewall_parallel_calls)
+        self.seed = seed
+
+    def simulate(self, policy=None, cycles=1000):
+        """Run the manager for a number of full cycles on a virtual clock and summarize it"""
+        unknown = set(policy or {}) - set(DEFAULT_POLICY)
+        if unknown:
+            raise ValueError(f"Unknown policy keys: {', '.join(sorted(unknown))}")
+        policy = dict(DEFAULT_POLICY, **(policy or {}))
+        rng = random.Random(self.seed)
+        firewall = SimulatedFirewall(rng, call_latency=self.firewall_latency,
+                                     parallel_calls=self.firewall_parallel_calls)
+        manager = SimulatedServerManager(
+            self.servers_data, self.preferred_servers, policy, firewall, self.model, rng
+        )
+
+        async def run():
+            await manager.fetch_server_data_async()
+            for _ in range(cycles):
+                await manager.run_server_cycle_async()
+                await asyncio.sleep(manager.cycle_restart_delay)
+
+        # The real manager logs every rule change; keep the log file quiet while simulating
+        root_logger = logging.getLogger()
+        previous_level = root_logger.level
+        root_logger.setLevel(logging.WARNING)
+        loop = VirtualClockEventLoop()
+        wall_start = time.perf_counter()
+        try:
+            loop.run_until_complete(run())
+        finally:
+            loop.close()
+            root_logger.setLevel(previous_level)
+        wall_time = time.perf_counter() - wall_start
+
+        return self.summarize(policy, manager, loop.virtual_time, wall_time, cycles)
+
+    def summarize(self, policy, manager, total_time, wall_time, cycles):
+        hours = total_time / 3600 if total_time else 1
+        outcomes = {}
+        for attempt in manager.attempts:
+            outcomes[attempt["outcome"]] = outcomes.get(attempt["outcome"], 0) + 1
+
+        matches = outcomes.get("success", 0)
+        failed_time = sum(a["duration"] for a in manager.attempts if a["outcome"] != "success")
+        match_time = sum(a["outcome_after"] for a in manager.attempts if a["outcome"] == "success")
+        # Everything except the runs that ended in a match is time not spent getting matches
+        wasted_time = total_time - sum(a["duration"] for a in manager.attempts if a["outcome"] == "success")
+
+        return {
+            "policy": policy,
+            "cycles": cycles,
+            "attempts": len(manager.attempts),
+            "outcomes": outcomes,
+            "simulated_hours": round(hours, 2),
+            "wall_seconds": round(wall_time, 3),
+            "matches_per_hour": round(matches / hours, 2),
+            "mean_time_to_match": round(match_time / matches, 1) if matches else None,
+            "wasted_seconds_per_hour": round(wasted_time / hours, 1),
+            "firewall_seconds_per_hour": round(manager.firewall_time / hours, 1),
+            "failed_attempt_seconds_per_hour": round(failed_time / hours, 1),
+            "firewall_calls": manager.firewall.calls,
+        }
+
+    def compare(self, policies, cycles=1000):
+        """Simulate each policy with the same seed so results differ only by policy"""
+        return [self.simulate(policy, cycles) for policy in policies]
+
+
+def _parse_automation_log(path):
+    """Split cs2_automation.log into per-run records with timings and outcome"""
+    runs = []
+    current = None
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = AUTOMATION_LOG_RE.match(line.strip())
+            if not match:
+                continue
+            timestamp = datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S")
+            message = match.group(2)
+
+            if message.startswith("=== CS2 Automation Script Started"):
+                current = {"start": timestamp}
+                runs.append(current)
+            elif current is None:
+                continue
+            elif message.startswith("Waiting for match outcome"):
+                current["waiting"] = timestamp
+            elif message.startswith("Match outcome: "):
+                current["outcome"] = message[len("Match outcome: "):].strip()
+                current["outcome_time"] = timestamp
+            elif message.startswith("Automation completed"):
+                current["end"] = timestamp
+    return [run for run in runs if "outcome" in run and "waiting" in run]
+
+
+def _parse_manager_log(path):
+    """Return ([(time, server)] test/cycle starts, [netsh call seconds]) from a manager log"""
+    starts = []
+    call_times = []
+    previous = None
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = MANAGER_LOG_RE.match(line.strip())
+            if not match:
+                continue
+            timestamp = datetime.strptime(f"{match.group(1)}.{match.group(2)}", "%Y-%m-%d %H:%M:%S.%f")
+            message = match.group(3)
+
+            for prefix in ("Running single server test with: ", "Processing server "):
+                if message.startswith(prefix):
+                    server = message[len(prefix):]
+                    if prefix == "Processing server ":
+                        server = server.split(": ", 1)[-1]
+                    starts.append((timestamp, server.strip()))
+
+            # Rule changes are logged between a show and an add/delete call, so the gap
+            # between consecutive rule lines is one call for "already/not blocked" and two otherwise
+            calls = None
+            if message.startswith(("Server already blocked", "Server not blocked")):
+                calls = 1
+            elif message.startswith(("Blocking server:", "Unblocking server:")):
+                calls = 2
+            if calls and previous is not None:
+                gap = (timestamp - previous).total_seconds()
+                if 0 < gap < 2:
+                    call_times.append(gap / calls)
+            previous = timestamp if calls else None
+    return starts, call_times
+
+
+def fit_from_logs(automation_log, manager_logs=()):
+    """Fit a MatchmakingModel and netsh call latency from recorded logs.
+
+    Returns (model, firewall_latency, run_count). POP-specific success rates are
+    only produced for POPs that appear in the manager logs.
+    """
+    runs = _parse_automation_log(automation_log)
+    starts = []
+    call_times = []
+    for path in manager_logs:
+        if os.path.exists(path):
+            log_starts, log_calls = _parse_manager_log(path)
+            starts.extend(log_starts)
+            call_times.extend(log_calls)
+    starts.sort()
+
+    model = MatchmakingModel()
+    firewall_latency = statistics.median(call_times) if call_times else 0.12
+    if not runs:
+        return model, firewall_latency, 0
+
+    def seconds(run, a, b):
+        return (run[b] - run[a]).total_seconds()
+
+    model.ui_overhead = statistics.mean(seconds(r, "start", "waiting") for r in runs)
+    successes = [r for r in runs if r["outcome"] == "success"]
+    failures = [r for r in runs if r["outcome"] != "success"]
+    # Laplace smoothing keeps a handful of recorded runs from producing 0% or 100%
+    model.success_rate = (len(successes) + 1) / (len(runs) + 2)
+    if successes:
+        model.mean_match_time = max(1.0, statistics.mean(seconds(r, "waiting", "outcome_time") for r in successes))
+        ended = [r for r in successes if "end" in r]
+        if ended:
+            model.match_duration = statistics.mean(seconds(r, "outcome_time", "end") for r in ended)
+    if failures:
+        model.mean_failure_time = max(1.0, statistics.mean(seconds(r, "waiting", "outcome_time") for r in failures))
+        ended = [r for r in failures if "end" in r]
+        if ended:
+            model.recovery_time = statistics.mean(seconds(r, "outcome_time", "end") for r in ended)
+
+    # Attribute each run to the last POP the manager selected before it started
+    per_pop = {}
+    for run in runs:
+        pop = None
+        for timestamp, server in starts:
+            if timestamp > run["start"]:
+                break
+            pop = server
+        if pop is not None:
+            per_pop.setdefault(pop, []).append(run)
+    for pop, pop_runs in per_pop.items():
+        pop_successes = sum(1 for r in pop_runs if r["outcome"] == "success")
+        model.pops[pop] = {"success_rate": (pop_successes + 1) / (len(pop_runs) + 2)}
+
+    return model, firewall_latency, len(runs)
+
+
+def _print_results(results):
+    header = f"{'policy (changes from default)':<70} {'matches/h':>10} {'wasted s/h':>11} {'firewall s/h':>13} {'wall s':>8}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        policy = result["policy"]
+        label = ", ".join(f"{key}={value}" for key, value in policy.items() if value != DEFAULT_POLICY.get(key))
+        print(f"{label or 'defaults':<70} {result['matches_per_hour']:>10} {result['wasted_seconds_per_hour']:>11} "
+              f"{result['firewall_seconds_per_hour']:>13} {result['wall_seconds']:>8}")
+
+
+# Main execution
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulate server cycles on a virtual clock to compare timing policies")
+    parser.add_argument("--cycles", type=int, default=1000, help="full preferred-list cycles per policy")
+    parser.add_argument("--policies", help="JSON file with a list of policy dicts (defaults to a small built-in sweep)")
+    parser.add_argument("--model", help="JSON file with MatchmakingModel parameters (defaults to fitting from logs)")
+    parser.add_argument("--firewall-parallel-calls", type=int, default=1,
+                        help="netsh calls the firewall service completes at once (1 = serialized)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    server_snapshot_file = os.path.join(data_directory, "all_servers.bin")
+    all_servers_file = os.path.join(data_directory, "all_servers.json")
+    preferred_servers_file = os.path.join(data_directory, "preferred_servers.txt")
+    try:
+        if os.path.exists(server_snapshot_file):
+            with ServerSnapshot(server_snapshot_file) as snapshot:
+                servers_data = snapshot.to_servers_data()
+        else:
+            with open(all_servers_file, 'r') as f:
+                servers_data = json.load(f)
+        with open(preferred_servers_file, 'r') as f:
+            preferred_servers = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    except Exception as e:
+        print(f"Error loading server data: {e}")
+        sys.exit(1)
+
+    firewall_latency = 0.12
+    if args.model:
+        with open(args.model, 'r') as f:
+            model = MatchmakingModel.from_dict(json.load(f))
+    else:
+        model, firewall_latency, run_count = fit_from_logs(
+            os.path.join(log_directory, "cs2_automation.log"),
+            [os.path.join(log_directory, "cs2_server_manager.log"),
+             os.path.join(log_directory, "cs2_test_server_manager.log")]
+        )
+        print(f"Fitted model from {run_count} recorded runs, netsh call latency {firewall_latency:.3f}s")
+        print(json.dumps(model.to_dict(), indent=4))
+
+    if args.policies:
+        with open(args.policies, 'r') as f:
+            policies = json.load(f)
+    else:
+        policies = [
+            {},
+            {"server_cycle_delay": 0},
+            {"ahk_timeout": 120},
+            {"ahk_timeout": 120, "server_cycle_delay": 2, "cycle_restart_delay": 2},
+        ]
+        if args.firewall_parallel_calls > 1:
+            policies.append({"firewall_concurrency": 1})
+
+    simulator = CycleSimulator(servers_data, preferred_servers, model, firewall_latency, seed=args.seed,
+                               firewall_parallel_calls=args.firewall_parallel_calls)
+    results = simulator.compare(policies, cycles=args.cycles)
+    _print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"Results written to {args.output}")
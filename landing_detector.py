@@ -0,0 +1,233 @@
+import asyncio
+import ipaddress
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_right
+
+PROC_NET_UDP = "/proc/net/udp"
+UNCONNECTED = "00000000:0000"
+
+
+def parse_proc_net_udp(text, byteorder=sys.byteorder):
+    """Return the (remote IPv4 as int, remote port) pairs of connected sockets in /proc/net/udp text.
+
+    The kernel prints each address as the host-endian u32 of the network-order bytes,
+    so byteorder must be that of the machine the table was captured on.
+    """
+    endpoints = []
+    for line in text.splitlines()[1:]:
+        fields = line.split(None, 3)
+        if len(fields) < 3 or fields[2] == UNCONNECTED:
+            continue
+        address, _, port = fields[2].partition(":")
+        endpoints.append((int.from_bytes(bytes.fromhex(address), byteorder), int(port, 16)))
+    return endpoints
+
+
+class ProcNetUdpSource:
+    """Connection-table source that reads /proc/net/udp (Linux)"""
+
+    def __init__(self, path=PROC_NET_UDP):
+        self.path = path
+
+    def __call__(self):
+        with open(self.path, 'r') as f:
+            return parse_proc_net_udp(f.read())
+
+
+class FixtureSource:
+    """Replays a connection-table recording made with record_fixture.
+
+    Each call returns the next recorded frame (the last one repeats once the recording
+    runs out) and time() returns that frame's recorded timestamp, so a detector driven
+    by a fixture reports the same timings as the live run did.
+    """
+
+    def __init__(self, path, byteorder="little"):
+        self.frames = []
+        timestamp, lines = None, []
+        with open(path, 'r') as f:
+            for line in f:
+                if line.startswith("# t="):
+                    if timestamp is not None:
+                        self.frames.append((timestamp, parse_proc_net_udp("".join(lines), byteorder)))
+                    timestamp, lines = float(line[4:]), []
+                else:
+                    lines.append(line)
+        if timestamp is not None:
+            self.frames.append((timestamp, parse_proc_net_udp("".join(lines), byteorder)))
+        if not self.frames:
+            raise ValueError(f"No frames in fixture: {path}")
+        self.position = -1
+
+    def __call__(self):
+        self.position = min(self.position + 1, len(self.frames) - 1)
+        return self.frames[self.position][1]
+
+    def time(self):
+        return self.frames[max(self.position, 0)][0]
+
+
+def record_fixture(output_path, samples=100, interval=0.25, path=PROC_NET_UDP):
+    """Record raw /proc/net/udp frames with relative timestamps for later replay"""
+    start = time.monotonic()
+    with open(output_path, 'w') as out:
+        for _ in range(samples):
+            with open(path, 'r') as f:
+                table = f.read()
+            out.write(f"# t={time.monotonic() - start:.3f}\n")
+            out.write(table if table.endswith("\n") else table + "\n")
+            time.sleep(interval)
+
+
+class PopRangeIndex:
+    """Maps IPv4 addresses to POP names with a binary search over sorted address ranges.
+
+    Consecutive relay addresses of the same POP are merged into one range, so a
+    lookup is a single bisect over a compact array regardless of relay count.
+    """
+
+    def __init__(self, servers_data):
+        entries = []
+        for server_name, ips in servers_data.items():
+            for ip in ips.split(","):
+                ip = ip.strip()
+                if ip:
+                    entries.append((int(ipaddress.IPv4Address(ip)), server_name))
+        entries.sort()
+
+        self.starts = array('I')
+        self.ends = array('I')
+        self.pops = []
+        for address, server_name in entries:
+            if self.pops and self.pops[-1] == server_name and self.ends[-1] + 1 >= address:
+                self.ends[-1] = max(self.ends[-1], address)
+            else:
+                self.starts.append(address)
+                self.ends.append(address)
+                self.pops.append(server_name)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Build the index from a ServerSnapshot's range table instead of re-parsing every address"""
+        index = cls.__new__(cls)
+        index.starts = array('I', snapshot.range_starts)
+        index.ends = array('I', snapshot.range_ends)
+        names = [snapshot.name(i) for i in range(len(snapshot))]
+        index.pops = [names[pop_index] for pop_index in snapshot.range_pops]
+        return index
+
+    def lookup(self, address):
+        """Return the POP owning an integer IPv4 address, or None"""
+        i = bisect_right(self.starts, address) - 1
+        if i >= 0 and address <= self.ends[i]:
+            return self.pops[i]
+        return None
+
+    def __len__(self):
+        return len(self.pops)
+
+
+class LandingDetector:
+    """Watches the connection table for the first relay socket opened after arm().
+
+    source is any callable returning (remote IPv4 as int, remote port) pairs; use
+    ProcNetUdpSource on Linux, FixtureSource for recorded tables, or plug in a
+    platform-specific sampler on Windows.
+    """
+
+    def __init__(self, servers_data, source, interval=0.25, clock=None):
+        self.source = source
+        self.interval = interval
+        self.clock = clock or getattr(source, "time", time.monotonic)
+        self.servers_data = None
+        self.index = None
+        self.set_servers(servers_data)
+        self.baseline = set()
+        self.armed_at = None
+
+    def set_servers(self, servers_data, index=None):
+        """Use a prebuilt index for servers_data, or rebuild the index if the server data changed"""
+        if index is not None:
+            self.servers_data = servers_data
+            self.index = index
+        elif self.servers_data is not servers_data:
+            self.servers_data = servers_data
+            self.index = PopRangeIndex(servers_data)
+
+    def arm(self):
+        """Start timing and ignore relay sockets that already exist"""
+        self.baseline = set(self.source())
+        self.armed_at = self.clock()
+
+    def poll(self):
+        """Sample once; return a landing dict for the first new relay endpoint, or None"""
+        for endpoint in self.source():
+            if endpoint in self.baseline:
+                continue
+            pop = self.index.lookup(endpoint[0])
+            if pop is not None:
+                return {
+                    "pop": pop,
+                    "endpoint": f"{ipaddress.IPv4Address(endpoint[0])}:{endpoint[1]}",
+                    "time_to_first_relay": round(self.clock() - self.armed_at, 3),
+                }
+        return None
+
+    async def wait_for_landing_async(self, timeout=None):
+        """Poll every interval seconds until a relay socket appears or timeout passes"""
+        if self.armed_at is None:
+            self.arm()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        while True:
+            landing = self.poll()
+            if landing is not None:
+                return landing
+            if deadline is not None and loop.time() >= deadline:
+                return None
+            await asyncio.sleep(self.interval)
+
+
+def default_source():
+    """Return the connection-table source for this platform, or None if there is none"""
+    if os.path.exists(PROC_NET_UDP):
+        return ProcNetUdpSource()
+    return None
+
+
+# Main execution
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Record or replay connection-table fixtures for landing detection")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record_parser = subparsers.add_parser("record", help="record /proc/net/udp frames")
+    record_parser.add_argument("output")
+    record_parser.add_argument("--samples", type=int, default=240)
+    record_parser.add_argument("--interval", type=float, default=0.25)
+    replay_parser = subparsers.add_parser("replay", help="run the detector over a recorded fixture")
+    replay_parser.add_argument("fixture")
+    replay_parser.add_argument("servers", help="all_servers.json to map endpoints to POPs")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        print(f"Recording {args.samples} frames to {args.output}...")
+        record_fixture(args.output, args.samples, args.interval)
+    else:
+        with open(args.servers, 'r') as f:
+            servers_data = json.load(f)
+        source = FixtureSource(args.fixture)
+        detector = LandingDetector(servers_data, source)
+        detector.arm()
+        for _ in range(len(source.frames)):
+            landing = detector.poll()
+            if landing is not None:
+                print(f"Landed on {landing['pop']} via {landing['endpoint']} "
+                      f"after {landing['time_to_first_relay']}s")
+                break
+        else:
+            print("No relay connection found in fixture")
@@ -0,0 +1,294 @@
+import requests
+import json
+import gzip
+import os
+import sys
+import threading
+import logging
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from server_snapshot import content_version
+
+SDR_API_URL = "https://api.steampowered.com/ISteamApps/GetSDRConfig/v1/?appid=730"
+DEFAULT_PORT = 8730
+KEEPALIVE_INTERVAL = 15  # seconds between SSE keep-alive comments
+
+
+def normalize_sdr_config(data):
+    """Convert a GetSDRConfig response into {server name: comma-joined IPs}"""
+    servers = {}
+    for server_code, server_info in data.get("pops", {}).items():
+        server_name = server_info.get("desc", "Unknown") + f" ({server_code})"
+        ip_addresses = []
+
+        for relay in server_info.get("relays", []):
+            ip = relay.get("ipv4")
+            if ip:
+                ip_addresses.append(ip)
+
+        if ip_addresses:
+            servers[server_name] = ",".join(ip_addresses)
+    return servers
+
+
+class SDRSnapshotService:
+    """Fetches the SDR config once for the whole fleet and keeps the current snapshot.
+
+    A snapshot is versioned by a hash of its normalized content, so every peer that
+    holds the same version is guaranteed to hold the same relay data. The gzip body is
+    built once per change rather than once per request.
+    """
+
+    def __init__(self, api_url=SDR_API_URL, refresh_interval=300, fetch_timeout=30):
+        self.api_url = api_url
+        self.refresh_interval = refresh_interval
+        self.fetch_timeout = fetch_timeout
+        self.version = None
+        self.sequence = 0
+        self.body = None
+        self.gzip_body = None
+        self.changed = threading.Condition()
+        self.stop_event = threading.Event()
+
+    def refresh(self):
+        """Fetch upstream once; returns True if the snapshot changed"""
+        try:
+            logging.info("Fetching server data from Steam API...")
+            response = requests.get(self.api_url, timeout=self.fetch_timeout)
+            response.raise_for_status()
+            servers = normalize_sdr_config(response.json())
+        except Exception as e:
+            logging.error(f"Error fetching server data: {str(e)}")
+            return False
+
+        if not servers:
+            logging.warning("Steam API returned no servers, keeping current snapshot")
+            return False
+
+        version = content_version(servers)
+        if version == self.version:
+            logging.info(f"Server data unchanged (snapshot {version})")
+            return False
+
+        body = json.dumps({
+            "version": version,
+            "sequence": self.sequence + 1,
+            "fetched_at": datetime.now().isoformat(timespec="seconds"),
+            "servers": servers,
+        }).encode("utf-8")
+
+        with self.changed:
+            self.body = body
+            self.gzip_body = gzip.compress(body)
+            self.version = version
+            self.sequence += 1
+            self.changed.notify_all()
+
+        logging.info(f"Published snapshot {version} (#{self.sequence}) with {len(servers)} servers, "
+                     f"{len(self.gzip_body)} bytes compressed")
+        return True
+
+    def wait_for_change(self, known_version, timeout):
+        """Block until the version differs from known_version or timeout passes"""
+        with self.changed:
+            self.changed.wait_for(
+                lambda: self.version != known_version or self.stop_event.is_set(), timeout
+            )
+            return self.version
+
+    def run_refresh_loop(self):
+        """Refresh the snapshot every refresh_interval seconds until stopped"""
+        while not self.stop_event.is_set():
+            self.refresh()
+            self.stop_event.wait(self.refresh_interval)
+
+    def stop(self):
+        self.stop_event.set()
+        with self.changed:
+            self.changed.notify_all()
+
+
+class SnapshotRequestHandler(BaseHTTPRequestHandler):
+    """Serves GET /snapshot (with ETag/If-None-Match) and GET /events (server-sent events)"""
+
+    service = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logging.info(f"{self.address_string()} - {format % args}")
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/snapshot":
+            self.send_snapshot()
+        elif path == "/events":
+            self.send_events()
+        else:
+            self.send_error(404)
+
+    def send_snapshot(self):
+        service = self.service
+        with service.changed:
+            version, body, gzip_body = service.version, service.body, service.gzip_body
+
+        if version is None:
+            self.send_error(503, "No snapshot available yet")
+            return
+
+        etag = f'"{version}"'
+        if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        use_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+        payload = gzip_body if use_gzip else body
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_events(self):
+        service = self.service
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        sent_version = None
+        try:
+            while not service.stop_event.is_set():
+                version = service.wait_for_change(sent_version, KEEPALIVE_INTERVAL)
+                if version is not None and version != sent_version:
+                    event = json.dumps({"version": version, "sequence": service.sequence})
+                    self.wfile.write(f"event: snapshot\ndata: {event}\n\n".encode("utf-8"))
+                    sent_version = version
+                else:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class SDRSnapshotClient:
+    """Polls a snapshot server with If-None-Match and listens for change notifications"""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.version = None
+        self.session = requests.Session()
+        self.watch_thread = None
+        self.stop_event = threading.Event()
+
+    def fetch(self):
+        """Return the servers dict if the snapshot changed since the last fetch, else None"""
+        headers = {"If-None-Match": f'"{self.version}"'} if self.version else {}
+        response = self.session.get(f"{self.base_url}/snapshot", headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        snapshot = response.json()
+        self.version = snapshot["version"]
+        return snapshot["servers"]
+
+    def start_watching(self, on_change):
+        """Call on_change(version) from a background thread whenever a new version is announced"""
+        if self.watch_thread is not None:
+            return
+        self.watch_thread = threading.Thread(target=self._watch, args=(on_change,), daemon=True)
+        self.watch_thread.start()
+
+    def stop_watching(self):
+        self.stop_event.set()
+
+    def _watch(self, on_change):
+        backoff = 1
+        while not self.stop_event.is_set():
+            try:
+                # The server sends a keep-alive well inside the read timeout
+                with requests.get(f"{self.base_url}/events", stream=True,
+                                  timeout=(self.timeout, KEEPALIVE_INTERVAL * 3)) as response:
+                    response.raise_for_status()
+                    backoff = 1
+                    # chunk_size=1 so each small event is delivered as soon as it arrives
+                    for line in response.iter_lines(chunk_size=1, decode_unicode=True):
+                        if self.stop_event.is_set():
+                            return
+                        if line and line.startswith("data:"):
+                            version = json.loads(line[5:]).get("version")
+                            # Before the first fetch there is nothing to invalidate
+                            if version and self.version is not None and version != self.version:
+                                on_change(version)
+            except Exception as e:
+                logging.warning(f"Snapshot event stream interrupted: {str(e)}")
+            self.stop_event.wait(backoff)
+            backoff = min(backoff * 2, 60)
+
+
+def serve(host="0.0.0.0", port=DEFAULT_PORT, refresh_interval=300):
+    """Run the snapshot server until interrupted"""
+    service = SDRSnapshotService(refresh_interval=refresh_interval)
+    handler = type("BoundSnapshotRequestHandler", (SnapshotRequestHandler,), {"service": service})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+
+    refresh_thread = threading.Thread(target=service.run_refresh_loop, daemon=True)
+    refresh_thread.start()
+
+    logging.info(f"SDR snapshot server listening on {host}:{port}")
+    print(f"SDR snapshot server listening on {host}:{port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("Snapshot server stopped by user")
+        logging.info("Snapshot server stopped by user")
+    finally:
+        service.stop()
+        httpd.server_close()
+
+
+# Main execution
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve shared SDR snapshots to managers on the LAN")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--interval", type=int, default=300, help="seconds between upstream fetches")
+    args = parser.parse_args()
+
+    home_dir = os.path.expanduser("~")
+    log_directory = os.path.join(home_dir, "OneDrive", "Документы", "AutoHotkey")
+    try:
+        os.makedirs(log_directory, exist_ok=True)
+    except Exception as e:
+        print(f"Error creating log directory: {e}")
+        log_directory = os.path.dirname(os.path.abspath(__file__))
+
+    log_file = os.path.join(log_directory, "sdr_snapshot_server.log")
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        filename=log_file,
+        filemode='a'  # Append mode
+    )
+    logging.info("=== SDR Snapshot Server Started ===")
+    print(f"Log file: {log_file}")
+
+    try:
+        serve(args.host, args.port, args.interval)
+    except Exception as e:
+        print(f"Unhandled exception: {e}")
+        logging.error(f"Unhandled exception: {e}", exc_info=True)
+        sys.exit(1)
@@ -1,3 +1,4 @@
+import asyncio
 import requests
 import json
 import subprocess
@@ -7,6 +8,10 @@ import time
 import logging
 from datetime import datetime
 
+from landing_detector import LandingDetector, PopRangeIndex, default_source
+from sdr_snapshot_server import SDRSnapshotClient, normalize_sdr_config
+from server_snapshot import ServerSnapshot, content_version, write_snapshot
+
 # Print startup message to console (will be visible in PowerShell window)
 print("CS2 Server Manager starting...")
 print(f"Script path: {os.path.abspath(__file__)}")
@@ -49,29 +54,89 @@ except Exception as e:
     print(f"Error setting up logging: {e}")
     sys.exit(1)
 
+# Defaults for the timing and limit settings the manager reads from config.json
+DEFAULT_CONFIG = {
+    "fetch_timeout": 30,  # seconds to wait for the Steam API
+    "command_timeout": 30,  # seconds to wait for a single netsh call
+    "ahk_timeout": 600,  # seconds before the AHK script is killed
+    "firewall_concurrency": 4,  # netsh calls allowed to run at once
+    "sdr_refresh_interval": 300,  # seconds before server data is re-fetched during a cycle
+    "server_cycle_delay": 5,  # seconds between server cycles
+    "cycle_restart_delay": 10,  # seconds before the preferred list is cycled again
+}
+
 class CS2ServerManager:
-    def __init__(self):
+    def __init__(self, config=None, landing_source=None):
         self.api_url = "https://api.steampowered.com/ISteamApps/GetSDRConfig/v1/?appid=730"
         self.servers_data = {}
         self.preferred_servers = []
         self.current_server_index = 0
-        self.netsh_path = os.path.join(os.environ["SystemRoot"], "System32", "netsh.exe")
+        self.netsh_path = os.path.join(os.environ.get("SystemRoot", "C:\\Windows"), "System32", "netsh.exe")
         self.ahk_script_path = os.path.join(os.getcwd(), "cs2_automation.ahk")
         
         # Set up data directories
         self.data_directory = data_directory
         self.preferred_servers_file = os.path.join(self.data_directory, "preferred_servers.txt")
         self.all_servers_file = os.path.join(self.data_directory, "all_servers.json")
+        self.server_snapshot_file = os.path.join(self.data_directory, "all_servers.bin")
         
         logging.info(f"Preferred servers file: {self.preferred_servers_file}")
         logging.info(f"All servers file: {self.all_servers_file}")
+        logging.info(f"Server snapshot file: {self.server_snapshot_file}")
+        
+        # Load configuration (callers such as the simulator may inject one instead)
+        if config is None:
+            self.load_config()
+        else:
+            self.config = config
+        
+        # Timeouts (seconds) and limits used by the async core
+        settings = dict(DEFAULT_CONFIG, **self.config)
+        self.fetch_timeout = settings["fetch_timeout"]
+        self.command_timeout = settings["command_timeout"]
+        self.ahk_timeout = settings["ahk_timeout"]
+        self.firewall_concurrency = max(1, settings["firewall_concurrency"])
+        self.sdr_refresh_interval = settings["sdr_refresh_interval"]
+        self.server_cycle_delay = settings["server_cycle_delay"]
+        self.cycle_restart_delay = settings["cycle_restart_delay"]
+        
+        # all_servers.bin is the working copy; the JSON export is only written when enabled
+        self.server_snapshot_version = None
+        self.json_export_enabled = self.config.get("export_servers_json", False)
         
-        # Load configuration
-        self.load_config()
+        # Runtime state shared between cycles
+        self.last_fetch_time = None
+        self.blocked_servers = set()  # kept across refreshes so rules of dropped POPs are still cleaned up
+        self.rule_ips = {}  # remoteip list each block rule was added with
+        self.prepared_server = None
+        
+        # Optional LAN snapshot server shared by the fleet (empty URL means fetch from Steam directly)
+        self.sdr_snapshot_url = self.config.get("sdr_snapshot_url", "")
+        self.snapshot_client = None
+        self.sdr_update_pending = False
+        if self.sdr_snapshot_url:
+            logging.info(f"Using SDR snapshot server: {self.sdr_snapshot_url}")
+            self.snapshot_client = SDRSnapshotClient(self.sdr_snapshot_url, timeout=self.fetch_timeout)
+            self.snapshot_client.start_watching(self._on_snapshot_changed)
+        
+        # Optional connection-table check of which POP a match actually landed on. landing_source
+        # supplies the connection table where there is no built-in source (e.g. a Windows sampler)
+        self.landing_detector = None
+        self.landing_early_exit = self.config.get("landing_early_exit", False)
+        self.last_landing = None
+        if self.config.get("landing_detection", False):
+            source = landing_source if landing_source is not None else default_source()
+            if source is not None:
+                self.landing_detector = LandingDetector(
+                    self.servers_data, source, self.config.get("landing_poll_interval", 0.25)
+                )
+            else:
+                logging.warning("Landing detection enabled but no connection-table source exists on this platform "
+                                "and none was passed as landing_source")
         
         # Load preferred servers if file exists
         self.load_preferred_servers()
-        
+    
     def load_preferred_servers(self):
         """Load preferred servers from file"""
         try:
@@ -84,122 +149,322 @@ class CS2ServerManager:
         except Exception as e:
             logging.error(f"Error loading preferred servers: {str(e)}")
     
-    def fetch_server_data(self):
-        """Fetch server data from Steam API"""
+    async def _run_command_async(self, cmd, timeout=None):
+        """Run a command without blocking the event loop, killing it on timeout or cancellation"""
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        return subprocess.CompletedProcess(
+            cmd, process.returncode,
+            stdout.decode('utf-8', errors='replace'),
+            stderr.decode('utf-8', errors='replace')
+        )
+    
+    async def _gather_limited(self, func, items):
+        """Run func(item) for every item with at most firewall_concurrency in flight"""
+        semaphore = asyncio.Semaphore(self.firewall_concurrency)
+        
+        async def run(item):
+            async with semaphore:
+                return await func(item)
+        
+        return await asyncio.gather(*(run(item) for item in items))
+    
+    async def _with_deadline(self, awaitable, deadline):
+        """Await with a deadline expressed in event loop time (None means no deadline)"""
+        if deadline is None:
+            return await awaitable
+        remaining = deadline - asyncio.get_running_loop().time()
+        return await asyncio.wait_for(awaitable, max(remaining, 0))
+    
+    def parse_sdr_config(self, data):
+        """Convert a GetSDRConfig response into {server name: comma-joined IPs}"""
+        return normalize_sdr_config(data)
+    
+    async def _fetch_sdr_config_async(self):
+        """Download the raw SDR config in a worker thread"""
+        response = await asyncio.to_thread(requests.get, self.api_url, timeout=self.fetch_timeout)
+        response.raise_for_status()
+        return response.json()
+    
+    def _on_snapshot_changed(self, version):
+        """Called from the snapshot watcher thread when the fleet snapshot changes"""
+        logging.info(f"Snapshot server announced new version: {version}")
+        self.sdr_update_pending = True
+    
+    def _update_landing_index(self, snapshot):
+        """Point the landing detector at the snapshot's range table for the current server data"""
+        if self.landing_detector is not None:
+            self.landing_detector.set_servers(self.servers_data, PopRangeIndex.from_snapshot(snapshot))
+    
+    def _save_servers_data(self):
+        """Save the binary server snapshot if the data changed, plus the JSON export when enabled"""
+        version = content_version(self.servers_data)
+        if version == self.server_snapshot_version:
+            logging.info(f"Server data unchanged (snapshot {version}), nothing to save")
+            return
+        
+        if self.server_snapshot_file:
+            try:
+                size = write_snapshot(self.server_snapshot_file, self.servers_data)
+                self.server_snapshot_version = version
+                logging.info(f"Server snapshot saved ({size} bytes)")
+                if self.landing_detector is not None:
+                    with ServerSnapshot(self.server_snapshot_file) as snapshot:
+                        self._update_landing_index(snapshot)
+            except Exception as e:
+                logging.error(f"Error saving server snapshot: {str(e)}")
+        if self.json_export_enabled:
+            self.export_servers_json()
+    
+    def export_servers_json(self):
+        """Write the human-readable all_servers.json for the current server data"""
+        if not self.all_servers_file:
+            return False
+        try:
+            with open(self.all_servers_file, "w") as f:
+                json.dump(self.servers_data, f, indent=4)
+            logging.info(f"Server list exported to {self.all_servers_file}")
+            return True
+        except Exception as e:
+            logging.error(f"Error exporting server list: {str(e)}")
+            return False
+    
+    def load_server_snapshot(self, max_age=None):
+        """Load server data from the saved binary snapshot.
+        
+        With max_age, only a snapshot written within the last max_age seconds is used.
+        The snapshot's age counts towards sdr_refresh_interval as if it had been fetched then.
+        """
+        try:
+            if not self.server_snapshot_file or not os.path.exists(self.server_snapshot_file):
+                logging.warning(f"Server snapshot not found: {self.server_snapshot_file}")
+                return False
+            age = max(time.time() - os.path.getmtime(self.server_snapshot_file), 0)
+            if max_age is not None and age >= max_age:
+                logging.info(f"Server snapshot is {age:.0f} seconds old, not using it")
+                return False
+            with ServerSnapshot(self.server_snapshot_file) as snapshot:
+                self.servers_data = snapshot.to_servers_data()
+                self.server_snapshot_version = snapshot.version
+                self._update_landing_index(snapshot)
+                logging.info(f"Loaded {len(self.servers_data)} servers from snapshot {snapshot.version}")
+            # Event loop time is monotonic time, so the refresh check sees the snapshot's real age
+            self.last_fetch_time = time.monotonic() - age
+            return True
+        except Exception as e:
+            logging.error(f"Error loading server snapshot: {str(e)}")
+            return False
+    
+    async def _fetch_from_snapshot_server_async(self):
+        """Fetch server data from the snapshot server; returns None if it is unavailable"""
+        try:
+            self.sdr_update_pending = False
+            servers = await asyncio.to_thread(self.snapshot_client.fetch)
+            self.last_fetch_time = asyncio.get_running_loop().time()
+            
+            if servers is None:
+                logging.info(f"Server data unchanged (snapshot {self.snapshot_client.version})")
+                return True
+            
+            self.servers_data = servers
+            logging.info(f"Fetched {len(self.servers_data)} servers from snapshot {self.snapshot_client.version}")
+            self._save_servers_data()
+            return True
+        except Exception as e:
+            logging.warning(f"Snapshot server unavailable, falling back to Steam API: {str(e)}")
+            return None
+    
+    async def fetch_server_data_async(self):
+        """Fetch server data from the snapshot server if configured, otherwise from Steam API"""
+        if self.snapshot_client is not None:
+            result = await self._fetch_from_snapshot_server_async()
+            if result is not None:
+                return result
+        
         try:
             logging.info("Fetching server data from Steam API...")
-            response = requests.get(self.api_url)
-            response.raise_for_status()
-            data = response.json()
+            data = await self._fetch_sdr_config_async()
             
-            # Process server data
-            for server_code, server_info in data.get("pops", {}).items():
-                server_name = server_info.get("desc", "Unknown") + f" ({server_code})"
-                ip_addresses = []
-                
-                for relay in server_info.get("relays", []):
-                    ip = relay.get("ipv4")
-                    if ip:
-                        ip_addresses.append(ip)
-                
-                if ip_addresses:
-                    self.servers_data[server_name] = ",".join(ip_addresses)
+            # Swap in the new data in one step so concurrent readers never see a partial dict
+            self.servers_data = self.parse_sdr_config(data)
+            self.last_fetch_time = asyncio.get_running_loop().time()
+            if self.snapshot_client is not None:
+                # The data no longer matches any fleet version, so the next poll must fetch it in full
+                self.snapshot_client.version = None
             
             logging.info(f"Successfully fetched {len(self.servers_data)} servers")
-            
-            # Save full server list for reference
-            with open(self.all_servers_file, "w") as f:
-                json.dump(self.servers_data, f, indent=4)
+            self._save_servers_data()
             
             return True
         except Exception as e:
             logging.error(f"Error fetching server data: {str(e)}")
             return False
     
-    def is_server_blocked(self, server_name):
+    async def refresh_server_data_if_stale_async(self):
+        """Re-fetch server data when the snapshot server announced a change or it is older than sdr_refresh_interval"""
+        if self.sdr_update_pending:
+            return await self.fetch_server_data_async()
+        if not self.sdr_refresh_interval:
+            return False
+        now = asyncio.get_running_loop().time()
+        if self.last_fetch_time is not None and now - self.last_fetch_time < self.sdr_refresh_interval:
+            return False
+        return await self.fetch_server_data_async()
+    
+    def _rule_name(self, server_name):
+        return f"CS2ServerPicker_{server_name.replace(' ', '')}"
+    
+    async def is_server_blocked_async(self, server_name):
         """Check if a server is blocked"""
-        server_rule_name = f"CS2ServerPicker_{server_name.replace(' ', '')}"
+        server_rule_name = self._rule_name(server_name)
         cmd = [self.netsh_path, "advfirewall", "firewall", "show", "rule", f"name={server_rule_name}"]
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-            return server_rule_name in result.stdout
+            result = await self._run_command_async(cmd, self.command_timeout)
+            blocked = server_rule_name in result.stdout
         except Exception as e:
             logging.error(f"Error checking if server is blocked: {str(e)}")
             return False
-    
-    def block_server(self, server_name):
-        """Block a specific server"""
-        if self.is_server_blocked(server_name):
-            logging.info(f"Server already blocked: {server_name}")
-            return True
         
+        if blocked:
+            self.blocked_servers.add(server_name)
+            # A rule found rather than added is assumed to match the data it was first seen with
+            self.rule_ips.setdefault(server_name, self.servers_data.get(server_name))
+        else:
+            self.blocked_servers.discard(server_name)
+            self.rule_ips.pop(server_name, None)
+        return blocked
+    
+    async def _add_block_rule_async(self, server_name):
+        """Add the firewall rule for a server without checking current state"""
         if server_name not in self.servers_data:
             logging.error(f"Server not found in data: {server_name}")
             return False
         
-        server_rule_name = f"CS2ServerPicker_{server_name.replace(' ', '')}"
         cmd = [
             self.netsh_path, "advfirewall", "firewall", "add", "rule",
-            f"name={server_rule_name}", "dir=out", "action=block", "protocol=ANY",
+            f"name={self._rule_name(server_name)}", "dir=out", "action=block", "protocol=ANY",
             f"remoteip={self.servers_data[server_name]}"
         ]
         
         try:
             logging.info(f"Blocking server: {server_name}")
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
+            result = await self._run_command_async(cmd, self.command_timeout)
             if result.returncode != 0:
                 logging.error(f"Failed to block server: {result.stderr}")
                 return False
+            self.blocked_servers.add(server_name)
+            self.rule_ips[server_name] = self.servers_data[server_name]
             return True
         except Exception as e:
             logging.error(f"Error blocking server: {str(e)}")
             return False
     
-    def unblock_server(self, server_name):
-        """Unblock a specific server"""
-        if not self.is_server_blocked(server_name):
-            logging.info(f"Server not blocked: {server_name}")
-            return True
-        
-        server_rule_name = f"CS2ServerPicker_{server_name.replace(' ', '')}"
+    async def _delete_block_rule_async(self, server_name):
+        """Delete the firewall rule for a server without checking current state"""
         cmd = [
             self.netsh_path, "advfirewall", "firewall", "delete", "rule",
-            f"name={server_rule_name}"
+            f"name={self._rule_name(server_name)}"
         ]
         
         try:
             logging.info(f"Unblocking server: {server_name}")
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
+            result = await self._run_command_async(cmd, self.command_timeout)
             if result.returncode != 0:
                 logging.error(f"Failed to unblock server: {result.stderr}")
                 return False
+            self.blocked_servers.discard(server_name)
+            self.rule_ips.pop(server_name, None)
             return True
         except Exception as e:
             logging.error(f"Error unblocking server: {str(e)}")
             return False
     
-    def block_all_except(self, exception_server_name):
-        """Block all servers except the specified one"""
-        logging.info(f"Blocking all servers except: {exception_server_name}")
-        
-        # First, unblock the exception server if needed
-        if exception_server_name in self.servers_data:
-            self.unblock_server(exception_server_name)
+    async def block_server_async(self, server_name):
+        """Block a specific server"""
+        if await self.is_server_blocked_async(server_name):
+            logging.info(f"Server already blocked: {server_name}")
+            return True
+        return await self._add_block_rule_async(server_name)
+    
+    async def unblock_server_async(self, server_name):
+        """Unblock a specific server"""
+        if not await self.is_server_blocked_async(server_name):
+            logging.info(f"Server not blocked: {server_name}")
+            return True
+        return await self._delete_block_rule_async(server_name)
+    
+    async def refresh_rule_state_async(self):
+        """Query the firewall for every known server and update blocked_servers"""
+        await self._gather_limited(self.is_server_blocked_async, sorted(set(self.servers_data) | self.blocked_servers))
+        return set(self.blocked_servers)
+    
+    def plan_transition(self, exception_server_name):
+        """Work out which rules must change so that only exception_server_name is reachable.
         
-        # Block all other servers
-        for server_name in self.servers_data:
-            if server_name != exception_server_name:
-                self.block_server(server_name)
+        Uses the cached blocked_servers state, so it should follow refresh_rule_state_async.
+        Rules of POPs that left the server data are removed, and rules whose relay IPs
+        changed since they were added are deleted and re-added with the current IPs.
+        """
+        to_unblock = []
+        to_block = []
+        for server_name in sorted(self.blocked_servers):
+            if server_name == exception_server_name or server_name not in self.servers_data:
+                to_unblock.append(server_name)
+            elif self.rule_ips.get(server_name) != self.servers_data[server_name]:
+                logging.info(f"Relay IPs changed for {server_name}, updating its rule")
+                to_unblock.append(server_name)
+                to_block.append(server_name)
+        to_block.extend(
+            server_name for server_name in self.servers_data
+            if server_name != exception_server_name and server_name not in self.blocked_servers
+        )
+        return {"server": exception_server_name, "unblock": to_unblock, "block": to_block}
+    
+    async def apply_transition_async(self, plan):
+        """Apply a plan from plan_transition; unblocks run before blocks"""
+        logging.info(
+            f"Switching to {plan['server']}: unblocking {len(plan['unblock'])}, "
+            f"blocking {len(plan['block'])} servers"
+        )
+        unblocked = await self._gather_limited(self._delete_block_rule_async, plan["unblock"])
+        blocked = await self._gather_limited(self._add_block_rule_async, plan["block"])
+        success = all(unblocked) and all(blocked)
+        self.prepared_server = plan["server"] if success else None
+        return success
+    
+    async def prepare_transition_async(self, next_server):
+        """Refresh stale SDR data and read the firewall state to plan the switch to next_server.
         
+        Only read-only firewall queries are made, so this is safe to run while the
+        automation script is still playing on the current server.
+        """
+        await self.refresh_server_data_if_stale_async()
+        await self.refresh_rule_state_async()
+        return self.plan_transition(next_server)
+    
+    async def block_all_except_async(self, exception_server_name):
+        """Block all servers except the specified one"""
+        logging.info(f"Blocking all servers except: {exception_server_name}")
+        await self.refresh_rule_state_async()
+        await self.apply_transition_async(self.plan_transition(exception_server_name))
         return True
     
-    def unblock_all_servers(self):
+    async def unblock_all_servers_async(self):
         """Unblock all servers"""
         logging.info("Unblocking all servers")
         
-        for server_name in self.servers_data:
-            self.unblock_server(server_name)
+        await self.refresh_rule_state_async()
+        await self._gather_limited(self._delete_block_rule_async, sorted(self.blocked_servers))
+        self.prepared_server = None
         
         return True
     
@@ -220,13 +485,13 @@ class CS2ServerManager:
             logging.error(f"Error loading configuration: {str(e)}")
             self.config = {}
             return False
-            
-    def run_ahk_script(self):
+    
+    async def run_ahk_script_async(self):
         """Run the AutoHotkey script"""
         try:
             logging.info("Running AHK script")
             ahk_executable = "C:\\Program Files\\AutoHotkey\\v2\\AutoHotkey.exe"
-            result = subprocess.run([ahk_executable, self.ahk_script_path], capture_output=True, text=True, encoding='utf-8')
+            result = await self._run_command_async([ahk_executable, self.ahk_script_path], self.ahk_timeout)
             
             if result.returncode != 0:
                 logging.error(f"AHK script failed: {result.stderr}")
@@ -234,11 +499,63 @@ class CS2ServerManager:
             
             logging.info("AHK script completed successfully")
             return True
+        except asyncio.TimeoutError:
+            logging.error(f"AHK script timed out after {self.ahk_timeout} seconds")
+            return False
         except Exception as e:
             logging.error(f"Error running AHK script: {str(e)}")
             return False
     
-    def cycle_to_next_server(self):
+    async def run_automation_async(self, server_name):
+        """Run the AHK script, confirming from the connection table which POP the match landed on.
+        
+        With landing_early_exit set, a confirmed landing on server_name ends the run
+        without waiting for the script's own UI polling to finish.
+        """
+        if self.landing_detector is None:
+            return await self.run_ahk_script_async()
+        
+        self.landing_detector.set_servers(self.servers_data)
+        self.last_landing = None
+        try:
+            self.landing_detector.arm()
+        except Exception as e:
+            logging.error(f"Landing detection unavailable, running AHK script without it: {str(e)}")
+            return await self.run_ahk_script_async()
+        
+        ahk_task = asyncio.create_task(self.run_ahk_script_async())
+        landing_task = asyncio.create_task(self.landing_detector.wait_for_landing_async(self.ahk_timeout))
+        try:
+            await asyncio.wait({ahk_task, landing_task}, return_when=asyncio.FIRST_COMPLETED)
+            
+            landing = None
+            if landing_task.done():
+                try:
+                    landing = landing_task.result()
+                except Exception as e:
+                    # A failing source must not take the cycle (and the firewall cleanup) down with it
+                    logging.error(f"Landing detection failed, waiting for AHK script instead: {str(e)}")
+            
+            if landing is not None:
+                self.last_landing = landing
+                logging.info(
+                    f"Match landed on {self.last_landing['pop']} via {self.last_landing['endpoint']} "
+                    f"after {self.last_landing['time_to_first_relay']}s"
+                )
+                if self.last_landing["pop"] != server_name:
+                    logging.warning(f"Expected to land on {server_name} but landed on {self.last_landing['pop']}")
+                elif self.landing_early_exit and not ahk_task.done():
+                    logging.info("Landing confirmed, stopping AHK script early")
+                    return True
+            elif ahk_task.done() and not landing_task.done():
+                logging.info("No relay connection detected during AHK script run")
+            
+            return await ahk_task
+        finally:
+            ahk_task.cancel()
+            landing_task.cancel()
+    
+    async def cycle_to_next_server_async(self):
         """Switch to the next server in the preferred list"""
         if not self.preferred_servers:
             logging.error("No preferred servers defined")
@@ -252,38 +569,100 @@ class CS2ServerManager:
         logging.info(f"Cycling from {current_server} to {next_server}")
         
         # Block current server and unblock next server
-        self.block_server(current_server)
-        self.unblock_server(next_server)
+        await self.block_server_async(current_server)
+        await self.unblock_server_async(next_server)
         
         return next_server
     
-    def run_server_cycle(self):
-        """Run a complete cycle through all preferred servers"""
+    async def run_server_cycle_async(self, timeout=None):
+        """Run a complete cycle through all preferred servers.
+        
+        While the automation script plays on the current server, stale SDR data is
+        refreshed and the switch to the next server is planned, so the only firewall
+        work left after the script returns is applying the changed rules.
+        
+        Args:
+            timeout: Optional overall deadline for the cycle in seconds
+        """
         if not self.preferred_servers:
             logging.error("No preferred servers defined")
             return False
         
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        
         logging.info("Starting server cycle")
         total_servers = len(self.preferred_servers)
         
-        for i in range(total_servers):
-            current_server = self.preferred_servers[self.current_server_index]
-            logging.info(f"Processing server {i+1}/{total_servers}: {current_server}")
-            
-            # Block all servers except current one
-            self.block_all_except(current_server)
-            
-            # Run AHK script
-            self.run_ahk_script()
-            
-            # Move to next server
-            self.cycle_to_next_server()
-            
-            # Wait briefly before next iteration
-            time.sleep(5)
+        try:
+            for i in range(total_servers):
+                current_server = self.preferred_servers[self.current_server_index]
+                next_server = self.preferred_servers[(self.current_server_index + 1) % total_servers]
+                logging.info(f"Processing server {i+1}/{total_servers}: {current_server}")
+                
+                # Block all servers except current one, unless the previous step already did
+                if self.prepared_server != current_server:
+                    await self._with_deadline(self.block_all_except_async(current_server), deadline)
+                
+                # Run AHK script while preparing the switch to the next server
+                ahk_task = asyncio.create_task(self.run_automation_async(current_server))
+                prepare_task = asyncio.create_task(self.prepare_transition_async(next_server))
+                try:
+                    await self._with_deadline(asyncio.gather(ahk_task, prepare_task), deadline)
+                finally:
+                    ahk_task.cancel()
+                    prepare_task.cancel()
+                
+                # Move to next server
+                self.current_server_index = (self.current_server_index + 1) % total_servers
+                logging.info(f"Cycling from {current_server} to {next_server}")
+                await self._with_deadline(self.apply_transition_async(prepare_task.result()), deadline)
+                
+                # Wait briefly before next iteration
+                await self._with_deadline(asyncio.sleep(self.server_cycle_delay), deadline)
+        except asyncio.TimeoutError:
+            logging.error(f"Server cycle exceeded its {timeout} second deadline")
+            self.prepared_server = None
+            return False
         
         logging.info("Server cycle completed")
         return True
+    
+    def fetch_server_data(self):
+        """Fetch server data from Steam API"""
+        return asyncio.run(self.fetch_server_data_async())
+    
+    def is_server_blocked(self, server_name):
+        """Check if a server is blocked"""
+        return asyncio.run(self.is_server_blocked_async(server_name))
+    
+    def block_server(self, server_name):
+        """Block a specific server"""
+        return asyncio.run(self.block_server_async(server_name))
+    
+    def unblock_server(self, server_name):
+        """Unblock a specific server"""
+        return asyncio.run(self.unblock_server_async(server_name))
+    
+    def block_all_except(self, exception_server_name):
+        """Block all servers except the specified one"""
+        return asyncio.run(self.block_all_except_async(exception_server_name))
+    
+    def unblock_all_servers(self):
+        """Unblock all servers"""
+        return asyncio.run(self.unblock_all_servers_async())
+    
+    def run_ahk_script(self):
+        """Run the AutoHotkey script"""
+        return asyncio.run(self.run_ahk_script_async())
+    
+    def cycle_to_next_server(self):
+        """Switch to the next server in the preferred list"""
+        return asyncio.run(self.cycle_to_next_server_async())
+    
+    def run_server_cycle(self, timeout=None):
+        """Run a complete cycle through all preferred servers"""
+        return asyncio.run(self.run_server_cycle_async(timeout))
 
 # Main execution
 if __name__ == "__main__":
@@ -297,17 +676,26 @@ if __name__ == "__main__":
         print("Creating server manager instance...")
         manager = CS2ServerManager()
         
-        # Fetch server data
-        print("Fetching server data...")
-        if not manager.fetch_server_data():
-            logging.error("Failed to fetch server data. Exiting.")
-            print("Failed to fetch server data. See log for details.")
-            sys.exit(1)
+        # A recent saved snapshot loads instantly; fleet members always sync with the snapshot server
+        if manager.snapshot_client is None and manager.load_server_snapshot(max_age=manager.sdr_refresh_interval):
+            print(f"Loaded {len(manager.servers_data)} servers from saved snapshot")
+        else:
+            # Fetch server data
+            print("Fetching server data...")
+            if not manager.fetch_server_data():
+                if manager.load_server_snapshot():
+                    logging.warning("Failed to fetch server data. Using saved server snapshot.")
+                    print("Failed to fetch server data. Using saved server snapshot.")
+                else:
+                    logging.error("Failed to fetch server data. Exiting.")
+                    print("Failed to fetch server data. See log for details.")
+                    sys.exit(1)
         
         # If no preferred servers defined, create an example file
         if not manager.preferred_servers:
             print("No preferred servers found. Creating example file...")
             logging.info("Creating example preferred servers file")
+            manager.export_servers_json()
             with open(manager.preferred_servers_file, 'w') as f:
                 f.write("# List your preferred servers below, one per line\n")
                 f.write("# Use the exact server names as they appear in all_servers.json\n")
@@ -328,7 +716,7 @@ if __name__ == "__main__":
                 manager.run_server_cycle()
                 logging.info("Completed full cycle, starting again...")
                 print("Completed full cycle, starting again...")
-                time.sleep(10)
+                time.sleep(manager.cycle_restart_delay)
         except KeyboardInterrupt:
             print("Script stopped by user")
             logging.info("Script stopped by user")
@@ -0,0 +1,348 @@
+import hashlib
+import ipaddress
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_right
+
+# File layout (all integers little-endian, every section 4-byte aligned):
+#   header        HEADER
+#   pops          POP_RECORD * pop_count
+#   ips           u32 * ip_count          relay addresses, grouped by POP
+#   cidr_nets     u32 * cidr_count        collapsed networks, grouped by POP
+#   cidr_prefixes u8  * cidr_count        prefix length of each network
+#   range_starts  u32 * cidr_count        every network as a range, sorted by start
+#   range_ends    u32 * cidr_count
+#   range_pops    u32 * cidr_count        POP index owning each range
+#   name_index    u32 * pop_count         POP indices sorted by UTF-8 name
+#   names         UTF-8 name blob
+MAGIC = b"CS2SNAP\0"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sHHIIII16s10I")
+POP_RECORD = struct.Struct("<IHHIIII")
+
+
+def _align(offset):
+    return (offset + 3) & ~3
+
+
+def _u32_view(buffer, offset, count):
+    """Zero-copy u32 view on little-endian hosts; a byte-swapped copy elsewhere"""
+    view = memoryview(buffer)[offset:offset + count * 4]
+    if sys.byteorder == "little":
+        return view.cast("I")
+    values = array("I", view.tobytes())
+    values.byteswap()
+    return values
+
+
+def content_hash(servers_data):
+    """16-byte hash of the server data; equal data always gives an equal hash"""
+    canonical = json.dumps(servers_data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(canonical).digest()[:16]
+
+
+def content_version(servers_data):
+    """Version string of the server data, shared by snapshot files and the snapshot server"""
+    return content_hash(servers_data).hex()
+
+
+def build_snapshot(servers_data):
+    """Serialize {server name: comma-joined IPs} into snapshot bytes"""
+    names = sorted(servers_data)
+    pop_records = []
+    ips = array("I")
+    cidr_nets = array("I")
+    cidr_prefixes = bytearray()
+    ranges = []
+    name_blob = bytearray()
+
+    for pop_index, server_name in enumerate(names):
+        addresses = sorted({
+            int(ipaddress.IPv4Address(ip.strip()))
+            for ip in servers_data[server_name].split(",") if ip.strip()
+        })
+        networks = list(ipaddress.collapse_addresses(ipaddress.IPv4Address(a) for a in addresses))
+        encoded_name = server_name.encode("utf-8")
+
+        pop_records.append((len(name_blob), len(encoded_name), 0,
+                            len(ips), len(addresses), len(cidr_nets), len(networks)))
+        name_blob += encoded_name
+        ips.extend(addresses)
+        for network in networks:
+            cidr_nets.append(int(network.network_address))
+            cidr_prefixes.append(network.prefixlen)
+            ranges.append((int(network.network_address), int(network.broadcast_address), pop_index))
+
+    ranges.sort()
+    name_index = array("I", sorted(range(len(names)), key=lambda i: names[i].encode("utf-8")))
+    range_starts = array("I", (r[0] for r in ranges))
+    range_ends = array("I", (r[1] for r in ranges))
+    range_pops = array("I", (r[2] for r in ranges))
+    if sys.byteorder != "little":
+        for values in (ips, cidr_nets, range_starts, range_ends, range_pops, name_index):
+            values.byteswap()
+
+    sections = [
+        b"".join(POP_RECORD.pack(*record) for record in pop_records),
+        ips.tobytes(),
+        cidr_nets.tobytes(),
+        bytes(cidr_prefixes),
+        range_starts.tobytes(),
+        range_ends.tobytes(),
+        range_pops.tobytes(),
+        name_index.tobytes(),
+        bytes(name_blob),
+    ]
+    offsets = []
+    offset = HEADER.size
+    for section in sections:
+        offset = _align(offset)
+        offsets.append(offset)
+        offset += len(section)
+    total_size = offset
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(names), len(ips), len(cidr_nets),
+                         len(name_blob), content_hash(servers_data), total_size, *offsets)
+
+    data = bytearray(total_size)
+    data[:HEADER.size] = header
+    for section_offset, section in zip(offsets, sections):
+        data[section_offset:section_offset + len(section)] = section
+    return bytes(data)
+
+
+def write_snapshot(path, servers_data, retries=5):
+    """Atomically replace the snapshot at path.
+
+    The new file is written next to the old one and swapped in with os.replace, so a
+    process opening the snapshot sees either the old or the new file, never a partial
+    one. Readers that already mapped the old file keep their mapping. On Windows the
+    swap fails while another process has the file mapped, so it is retried briefly.
+    """
+    data = build_snapshot(servers_data)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+    for attempt in range(retries):
+        try:
+            os.replace(temp_path, path)
+            return len(data)
+        except PermissionError:
+            if attempt == retries - 1:
+                os.remove(temp_path)
+                raise
+            time.sleep(0.1 * (attempt + 1))
+
+
+class ServerSnapshot:
+    """Read-only, memory-mapped view of a snapshot file.
+
+    Opening only validates the header and sets up views over the mapping; POP names,
+    addresses and networks are decoded on access.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            # The mapping stays valid after the file is closed or replaced
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        views = []
+        try:
+            if len(self.mmap) < HEADER.size:
+                raise ValueError(f"Snapshot too small: {path}")
+            (magic, version, _flags, self.pop_count, self.ip_count, self.cidr_count, names_size,
+             self.content_hash, total_size, *offsets) = HEADER.unpack_from(self.mmap, 0)
+            if magic != MAGIC:
+                raise ValueError(f"Not a server snapshot: {path}")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported snapshot version {version}: {path}")
+            if total_size != len(self.mmap):
+                raise ValueError(f"Truncated snapshot ({len(self.mmap)} of {total_size} bytes): {path}")
+
+            (pops_offset, ips_offset, nets_offset, prefixes_offset, starts_offset,
+             ends_offset, range_pops_offset, name_index_offset, names_offset) = offsets
+            self.buffer = memoryview(self.mmap)
+            views.append(self.buffer)
+            self.pops_offset = pops_offset
+            self.ips = self._section(views, ips_offset, self.ip_count)
+            self.cidr_nets = self._section(views, nets_offset, self.cidr_count)
+            self.cidr_prefixes = self.buffer[prefixes_offset:prefixes_offset + self.cidr_count]
+            views.append(self.cidr_prefixes)
+            self.range_starts = self._section(views, starts_offset, self.cidr_count)
+            self.range_ends = self._section(views, ends_offset, self.cidr_count)
+            self.range_pops = self._section(views, range_pops_offset, self.cidr_count)
+            self.name_index = self._section(views, name_index_offset, self.pop_count)
+            self.names_offset = names_offset
+        except Exception:
+            # The views must be released first, or the mapping cannot be closed
+            for view in views:
+                if isinstance(view, memoryview):
+                    view.release()
+            self.mmap.close()
+            raise
+
+    def _section(self, views, offset, count):
+        """u32 view of a section, recorded in views so a failed open can release it"""
+        if offset % 4 or offset + count * 4 > len(self.mmap):
+            raise ValueError(f"Corrupt snapshot section at offset {offset}: {self.path}")
+        view = _u32_view(self.mmap, offset, count)
+        views.append(view)
+        return view
+
+    @property
+    def version(self):
+        """content_version of the server data, independent of when it was written"""
+        return self.content_hash.hex()
+
+    def close(self):
+        """Release the mapping; views handed out by ip_values() keep it alive until they are dropped"""
+        views = [self.ips, self.cidr_nets, self.cidr_prefixes, self.range_starts,
+                 self.range_ends, self.range_pops, self.name_index, self.buffer]
+        for view in views:
+            if isinstance(view, memoryview):
+                view.release()
+        try:
+            self.mmap.close()
+        except BufferError:
+            # A caller still holds a view; the file is unmapped when the last one is released
+            pass
+        self.mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.pop_count
+
+    def _record(self, pop_index):
+        return POP_RECORD.unpack_from(self.buffer, self.pops_offset + pop_index * POP_RECORD.size)
+
+    def _name_bytes(self, pop_index):
+        name_offset, name_length = self._record(pop_index)[:2]
+        start = self.names_offset + name_offset
+        return self.mmap[start:start + name_length]
+
+    def name(self, pop_index):
+        return self._name_bytes(pop_index).decode("utf-8")
+
+    def find(self, server_name):
+        """Return the POP index for a name via binary search over the name index, or -1"""
+        target = server_name.encode("utf-8")
+        low, high = 0, self.pop_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._name_bytes(self.name_index[middle]) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.pop_count and self._name_bytes(self.name_index[low]) == target:
+            return self.name_index[low]
+        return -1
+
+    def __contains__(self, server_name):
+        return self.find(server_name) >= 0
+
+    def ip_values(self, pop_index):
+        """Relay addresses of a POP as a zero-copy u32 view (host-order integers)"""
+        _, _, _, ip_start, ip_count, _, _ = self._record(pop_index)
+        return self.ips[ip_start:ip_start + ip_count]
+
+    def ip_strings(self, pop_index):
+        return [str(ipaddress.IPv4Address(value)) for value in self.ip_values(pop_index)]
+
+    def cidrs(self, pop_index):
+        """Collapsed networks of a POP as 'a.b.c.d/n' strings"""
+        _, _, _, _, _, cidr_start, cidr_count = self._record(pop_index)
+        return [
+            f"{ipaddress.IPv4Address(self.cidr_nets[i])}/{self.cidr_prefixes[i]}"
+            for i in range(cidr_start, cidr_start + cidr_count)
+        ]
+
+    def lookup(self, address):
+        """Return the POP name owning an IPv4 address (str or int), or None"""
+        if isinstance(address, str):
+            address = int(ipaddress.IPv4Address(address))
+        i = bisect_right(self.range_starts, address) - 1
+        if i >= 0 and address <= self.range_ends[i]:
+            return self.name(self.range_pops[i])
+        return None
+
+    def to_servers_data(self):
+        """Decode into the {server name: comma-joined IPs} dict the managers use"""
+        return {self.name(i): ",".join(self.ip_strings(i)) for i in range(self.pop_count)}
+
+    def export_json(self, path):
+        """Write the human-readable all_servers.json equivalent"""
+        with open(path, "w") as f:
+            json.dump(self.to_servers_data(), f, indent=4)
+
+
+def _synthetic_servers(pop_count, relays_per_pop=6):
+    servers = {}
+    for i in range(pop_count):
+        base = (10 << 24) + i * 256
+        servers[f"Synthetic POP {i} (s{i})"] = ",".join(
+            str(ipaddress.IPv4Address(base + 10 + r)) for r in range(relays_per_pop)
+        )
+    return servers
+
+
+# Main execution
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert, export and benchmark binary server snapshots")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert_parser = subparsers.add_parser("convert", help="all_servers.json -> snapshot")
+    convert_parser.add_argument("json_file")
+    convert_parser.add_argument("snapshot_file")
+    export_parser = subparsers.add_parser("export", help="snapshot -> all_servers.json")
+    export_parser.add_argument("snapshot_file")
+    export_parser.add_argument("json_file")
+    bench_parser = subparsers.add_parser("bench", help="time opening a synthetic snapshot")
+    bench_parser.add_argument("--pops", type=int, default=5000)
+    bench_parser.add_argument("--runs", type=int, default=1000)
+    bench_parser.add_argument("--file", default="snapshot_bench.bin")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        with open(args.json_file, "r") as f:
+            size = write_snapshot(args.snapshot_file, json.load(f))
+        print(f"Snapshot written: {args.snapshot_file} ({size} bytes)")
+    elif args.command == "export":
+        with ServerSnapshot(args.snapshot_file) as snapshot:
+            snapshot.export_json(args.json_file)
+            print(f"Exported {len(snapshot)} servers to {args.json_file}")
+    else:
+        servers = _synthetic_servers(args.pops)
+        size = write_snapshot(args.file, servers)
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            snapshot = ServerSnapshot(args.file)
+            snapshot.close()
+        open_time = (time.perf_counter() - start) / args.runs
+        with ServerSnapshot(args.file) as snapshot:
+            start = time.perf_counter()
+            for i in range(args.runs):
+                snapshot.find(f"Synthetic POP {i % args.pops} (s{i % args.pops})")
+            find_time = (time.perf_counter() - start) / args.runs
+        json_text = json.dumps(servers, indent=4)
+        start = time.perf_counter()
+        json.loads(json_text)
+        json_time = time.perf_counter() - start
+        os.remove(args.file)
+        print(f"{args.pops} POPs, {size} bytes")
+        print(f"open: {open_time * 1e6:.1f} us, find by name: {find_time * 1e6:.1f} us, "
+              f"json.loads of all_servers.json: {json_time * 1e3:.2f} ms")
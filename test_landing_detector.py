@@ -0,0 +1,76 @@
+import asyncio
+import json
+import os
+import unittest
+
+from landing_detector import FixtureSource, LandingDetector, PopRangeIndex, parse_proc_net_udp
+
+base_directory = os.path.dirname(os.path.abspath(__file__))
+fixture_directory = os.path.join(base_directory, "fixtures")
+
+
+def load_servers():
+    with open(os.path.join(base_directory, "data", "all_servers.json"), 'r') as f:
+        return json.load(f)
+
+
+class LandingDetectorFixtureTest(unittest.TestCase):
+    """Replays connection-table fixtures through FixtureSource and LandingDetector.
+
+    The fixtures are synthetic (hand-built in record_fixture's format); they check the
+    detector's logic, not that CS2 relay traffic shows up as connected sockets.
+    """
+
+    def setUp(self):
+        self.servers_data = load_servers()
+
+    def replay(self, fixture_name):
+        source = FixtureSource(os.path.join(fixture_directory, fixture_name))
+        detector = LandingDetector(self.servers_data, source)
+        detector.arm()
+        for _ in range(len(source.frames)):
+            landing = detector.poll()
+            if landing is not None:
+                return landing
+        return None
+
+    def test_match_lands_on_relay_pop(self):
+        landing = self.replay("landing_udp_match_synthetic.txt")
+        self.assertIsNotNone(landing)
+        self.assertEqual(landing["pop"], "Frankfurt (Germany) (fra)")
+        self.assertEqual(landing["endpoint"], "155.133.226.70:27024")
+        self.assertEqual(landing["time_to_first_relay"], 41.75)
+
+    def test_unconnected_sockets_report_no_landing(self):
+        self.assertIsNone(self.replay("landing_udp_unconnected_synthetic.txt"))
+
+    def test_wait_for_landing_async(self):
+        source = FixtureSource(os.path.join(fixture_directory, "landing_udp_match_synthetic.txt"))
+        detector = LandingDetector(self.servers_data, source, interval=0)
+        landing = asyncio.run(detector.wait_for_landing_async(timeout=5))
+        self.assertEqual(landing["pop"], "Frankfurt (Germany) (fra)")
+
+
+class ParseProcNetUdpTest(unittest.TestCase):
+    def test_skips_header_and_unconnected_rows(self):
+        text = (
+            "   sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n"
+            "   12: 3500007F:0035 00000000:0000 07 00000000:00000000 00:00000000 00000000  1000        0 21104\n"
+            "  152: 1701A8C0:F05D 4AE2859B:6990 01 00000000:00000000 00:00000000 00000000  1000        0 56017\n"
+        )
+        self.assertEqual(parse_proc_net_udp(text, "little"), [(0x9B85E24A, 0x6990)])
+
+
+class PopRangeIndexTest(unittest.TestCase):
+    def test_lookup(self):
+        index = PopRangeIndex({"A (a)": "10.0.0.1,10.0.0.2,10.0.0.3", "B (b)": "10.0.0.5"})
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.lookup(0x0A000002), "A (a)")
+        self.assertEqual(index.lookup(0x0A000005), "B (b)")
+        self.assertIsNone(index.lookup(0x0A000004))
+        self.assertIsNone(index.lookup(0x09000000))
+
+
+# Main execution
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from test_server_manager import parse_ping_times
+
+
+class ParsePingTimesTest(unittest.TestCase):
+    def test_english_windows(self):
+        output = (
+            "Pinging 155.133.226.70 with 32 bytes of data:\n"
+            "Reply from 155.133.226.70: bytes=32 time=41ms TTL=54\n"
+            "Reply from 155.133.226.70: bytes=32 time<1ms TTL=54\n"
+            "Request timed out.\n"
+            "\n"
+            "Ping statistics for 155.133.226.70:\n"
+            "    Packets: Sent = 3, Received = 2, Lost = 1 (33% loss),\n"
+            "Approximate round trip times in milli-seconds:\n"
+            "    Minimum = 0ms, Maximum = 41ms, Average = 20ms\n"
+        )
+        self.assertEqual(parse_ping_times(output), [41.0, 1.0])
+
+    def test_russian_windows(self):
+        output = (
+            "Обмен пакетами с 155.133.226.70 по с 32 байтами данных:\n"
+            "Ответ от 155.133.226.70: число байт=32 время=41мс TTL=54\n"
+            "Ответ от 155.133.226.70: число байт=32 время<1мс TTL=54\n"
+            "Превышен интервал ожидания для запроса.\n"
+            "Ответ от 192.168.1.1: Заданный узел недоступен.\n"
+            "\n"
+            "Статистика Ping для 155.133.226.70:\n"
+            "    Пакетов: отправлено = 4, получено = 3, потеряно = 1\n"
+            "Приблизительное время приема-передачи в мс:\n"
+            "    Минимальное = 0мсек, Максимальное = 41 мсек, Среднее = 20 мсек\n"
+        )
+        self.assertEqual(parse_ping_times(output), [41.0, 1.0])
+
+    def test_russian_windows_from_oem_code_page(self):
+        output = "Ответ от 155.133.226.70: число байт=32 время=12мс TTL=54\n"
+        decoded = output.encode("cp866").decode("cp866")
+        self.assertEqual(parse_ping_times(decoded), [12.0])
+
+    def test_german_windows(self):
+        output = "Antwort von 155.133.226.70: Bytes=32 Zeit=12ms TTL=54\n"
+        self.assertEqual(parse_ping_times(output), [12.0])
+
+    def test_linux(self):
+        output = (
+            "PING 155.133.226.70 (155.133.226.70) 56(84) bytes of data.\n"
+            "64 bytes from 155.133.226.70: icmp_seq=1 ttl=54 time=41.3 ms\n"
+            "From 10.231.0.1 icmp_seq=2 Destination Port Unreachable\n"
+            "64 bytes from 155.133.226.70: icmp_seq=3 ttl=54 time=0.912 ms\n"
+            "\n"
+            "--- 155.133.226.70 ping statistics ---\n"
+            "3 packets transmitted, 2 received, +1 errors, 33.3333% packet loss, time 2003ms\n"
+            "rtt min/avg/max/mdev = 0.912/21.106/41.300/20.194 ms\n"
+        )
+        self.assertEqual(parse_ping_times(output), [41.3, 0.912])
+
+    def test_no_replies(self):
+        self.assertEqual(parse_ping_times("Request timed out.\nRequest timed out.\n"), [])
+        self.assertEqual(parse_ping_times(""), [])
+
+
+# Main execution
+if __name__ == "__main__":
+    unittest.main()
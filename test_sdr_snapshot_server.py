@@ -0,0 +1,141 @@
+import asyncio
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sdr_snapshot_server import SDRSnapshotClient, SDRSnapshotService, SnapshotRequestHandler
+
+
+def sdr_config(relays):
+    """Minimal GetSDRConfig response with one POP per (code, desc, ips) entry"""
+    return {"pops": {
+        code: {"desc": desc, "relays": [{"ipv4": ip} for ip in ips]}
+        for code, desc, ips in relays
+    }}
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    """Stands in for the Steam API; serves whatever config the test set last"""
+
+    config = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = json.dumps(self.config).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_server(handler):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+
+
+class SnapshotServerTest(unittest.TestCase):
+    def setUp(self):
+        self.upstream_handler = type("Upstream", (UpstreamHandler,), {})
+        self.upstream_handler.config = sdr_config([("fra", "Frankfurt (Germany)", ["155.133.226.68"])])
+        self.upstream, self.upstream_url = start_server(self.upstream_handler)
+        self.service, self.httpd, self.url = self.start_snapshot_server()
+
+    def tearDown(self):
+        self.service.stop()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.upstream.shutdown()
+        self.upstream.server_close()
+
+    def start_snapshot_server(self):
+        service = SDRSnapshotService(api_url=self.upstream_url, fetch_timeout=5)
+        self.assertTrue(service.refresh())
+        handler = type("BoundSnapshotRequestHandler", (SnapshotRequestHandler,), {"service": service})
+        httpd, url = start_server(handler)
+        return service, httpd, url
+
+    def change_upstream(self):
+        self.upstream_handler.config = sdr_config([
+            ("fra", "Frankfurt (Germany)", ["155.133.226.68", "155.133.226.69"]),
+            ("vie", "Vienna (Austria)", ["146.66.155.66"]),
+        ])
+
+    def test_unchanged_snapshot_returns_304(self):
+        client = SDRSnapshotClient(self.url, timeout=5)
+        servers = client.fetch()
+        self.assertEqual(servers, {"Frankfurt (Germany) (fra)": "155.133.226.68"})
+        self.assertEqual(client.version, self.service.version)
+
+        # Same version: the server answers 304 and the client reports no change
+        self.assertIsNone(client.fetch())
+        self.assertFalse(self.service.refresh())
+        self.assertIsNone(client.fetch())
+
+        self.change_upstream()
+        self.assertTrue(self.service.refresh())
+        servers = client.fetch()
+        self.assertEqual(len(servers), 2)
+        self.assertEqual(client.version, self.service.version)
+
+    def test_event_stream_announces_new_version(self):
+        client = SDRSnapshotClient(self.url, timeout=5)
+        client.fetch()
+        announced = []
+        received = threading.Event()
+
+        def on_change(version):
+            announced.append(version)
+            received.set()
+
+        client.start_watching(on_change)
+        try:
+            self.change_upstream()
+            self.assertTrue(self.service.refresh())
+            self.assertTrue(received.wait(10), "no change event received")
+            self.assertEqual(announced[0], self.service.version)
+        finally:
+            client.stop_watching()
+
+    def test_manager_refetches_after_steam_fallback(self):
+        from server_manager import CS2ServerManager
+
+        manager = CS2ServerManager(config={"sdr_snapshot_url": self.url})
+        manager.all_servers_file = None
+        manager.server_snapshot_file = None
+        manager.api_url = self.upstream_url
+        manager.snapshot_client.stop_watching()
+        try:
+            self.assertTrue(asyncio.run(manager.fetch_server_data_async()))
+            fleet_version = manager.snapshot_client.version
+            self.assertIsNotNone(fleet_version)
+
+            # Snapshot server down: the manager falls back to the (changed) upstream directly
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            manager.snapshot_client.session.close()  # drop the kept-alive connection to the old server
+            self.change_upstream()
+            self.assertTrue(asyncio.run(manager.fetch_server_data_async()))
+            self.assertEqual(len(manager.servers_data), 2)
+            self.assertIsNone(manager.snapshot_client.version)
+
+            # Back on a snapshot server still holding the old fleet version: a full fetch, not a 304
+            self.upstream_handler.config = sdr_config([("fra", "Frankfurt (Germany)", ["155.133.226.68"])])
+            self.service, self.httpd, self.url = self.start_snapshot_server()
+            self.assertEqual(self.service.version, fleet_version)
+            manager.snapshot_client.base_url = self.url
+            self.assertTrue(asyncio.run(manager.fetch_server_data_async()))
+            self.assertEqual(manager.servers_data, {"Frankfurt (Germany) (fra)": "155.133.226.68"})
+            self.assertEqual(manager.snapshot_client.version, fleet_version)
+        finally:
+            manager.snapshot_client.stop_watching()
+
+
+# Main execution
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,13 @@
+import asyncio
 import requests
 import json
+import locale
+import re
+import statistics
 import subprocess
 import os
 import sys
+import time
 import logging
 from datetime import datetime
 
@@ -23,12 +28,220 @@ logging.basicConfig(
 )
 logging.info("=== CS2 Test Server Manager Started ===")
 
+# Defaults for batch (non-interactive) testing; a plan file may override any of these
+DEFAULT_TEST_PLAN = {
+    "probe_count": 3,          # pings sent to each probed relay
+    "probe_timeout": 2,        # seconds to wait for each ping reply
+    "max_relays": 4,           # relays probed per POP
+    "verify_blocked": True,    # also check that a relay of another POP is unreachable
+    "run_automation": False,   # host mode only: run the AHK script after switching
+    "automation_timeout": 300, # seconds before the AHK script is killed (it ends on a MsgBox)
+}
+
+# Only the words in ping output are translated ("time=12ms" is "время=12мс" on Russian Windows),
+# so a reply is recognised by its TTL field: Windows prints the time right before "TTL=",
+# Linux right after "ttl="
+WINDOWS_REPLY_PATTERN = re.compile(r"[=<]([\d.]+)\s*[^\s=<]*\s+TTL=\d+")
+LINUX_REPLY_PATTERN = re.compile(r"ttl=\d+\s+\S+?[=<]([\d.]+)")
+
+
+def parse_ping_times(output):
+    """Return the round-trip times (ms) of the replies in ping output, in any language"""
+    times = []
+    for line in output.splitlines():
+        match = WINDOWS_REPLY_PATTERN.search(line) or LINUX_REPLY_PATTERN.search(line)
+        if match:
+            times.append(float(match.group(1)))
+    return times
+
+
+def console_encoding():
+    """Encoding console programs such as ping write in (the OEM code page on Windows, e.g. cp866)"""
+    if sys.platform == "win32":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        return f"cp{kernel32.GetConsoleOutputCP() or kernel32.GetOEMCP()}"
+    return locale.getpreferredencoding(False)
+
+
+class NamespaceTestRunner:
+    """Runs POP tests in parallel, each in its own Linux network namespace.
+    
+    Every test slot gets a namespace joined to the host by a veth pair and NATed out
+    through the host, plus an nftables ruleset that lives only inside the namespace.
+    Tests therefore never touch the host firewall or each other.
+    """
+    
+    def __init__(self, servers_data, plan, parallel=4):
+        self.servers_data = servers_data
+        self.plan = plan
+        self.parallel = max(1, parallel)
+        self.ip_forward_file = "/proc/sys/net/ipv4/ip_forward"
+        self.original_ip_forward = None
+    
+    async def _run(self, cmd, timeout=30, input_text=None):
+        """Run a command and return (returncode, stdout, stderr), killing it on timeout"""
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE if input_text is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(input_text.encode('utf-8') if input_text is not None else None), timeout
+            )
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        return process.returncode, stdout.decode('utf-8', errors='replace'), stderr.decode('utf-8', errors='replace')
+    
+    async def _check(self, cmd, **kwargs):
+        returncode, stdout, stderr = await self._run(cmd, **kwargs)
+        if returncode != 0:
+            raise RuntimeError(f"{' '.join(cmd)} failed: {stderr.strip() or stdout.strip()}")
+        return stdout
+    
+    def _names(self, slot):
+        return f"cs2test{slot}", f"cs2h{slot}", f"cs2n{slot}", f"10.231.{slot}"
+    
+    def _nat_rules(self, slot):
+        _, host_if, _, subnet = self._names(slot)
+        return [
+            ["-t", "nat", "POSTROUTING", "-s", f"{subnet}.0/30", "!", "-o", host_if, "-j", "MASQUERADE"],
+            ["FORWARD", "-i", host_if, "-j", "ACCEPT"],
+            ["FORWARD", "-o", host_if, "-j", "ACCEPT"],
+        ]
+    
+    async def setup_namespace(self, slot):
+        """Create the namespace, veth pair, routing and NAT for a slot"""
+        namespace, host_if, ns_if, subnet = self._names(slot)
+        ns_exec = ["ip", "netns", "exec", namespace]
+        await self._check(["ip", "netns", "add", namespace])
+        await self._check(["ip", "link", "add", host_if, "type", "veth", "peer", "name", ns_if])
+        await self._check(["ip", "link", "set", ns_if, "netns", namespace])
+        await self._check(["ip", "addr", "add", f"{subnet}.1/30", "dev", host_if])
+        await self._check(["ip", "link", "set", host_if, "up"])
+        await self._check(ns_exec + ["ip", "link", "set", "lo", "up"])
+        await self._check(ns_exec + ["ip", "addr", "add", f"{subnet}.2/30", "dev", ns_if])
+        await self._check(ns_exec + ["ip", "link", "set", ns_if, "up"])
+        await self._check(ns_exec + ["ip", "route", "add", "default", "via", f"{subnet}.1"])
+        for rule in self._nat_rules(slot):
+            table = rule[:2] if rule[0] == "-t" else []
+            await self._check(["iptables"] + table + ["-I"] + rule[len(table):])
+    
+    async def teardown_namespace(self, slot):
+        """Remove everything setup_namespace created; safe to call on a partial setup"""
+        namespace, host_if, _, _ = self._names(slot)
+        for rule in self._nat_rules(slot):
+            table = rule[:2] if rule[0] == "-t" else []
+            await self._run(["iptables"] + table + ["-D"] + rule[len(table):])
+        await self._run(["ip", "link", "del", host_if])
+        await self._run(["ip", "netns", "del", namespace])
+    
+    def build_ruleset(self, server_name):
+        """nftables ruleset for the namespace that rejects every relay except server_name's"""
+        blocked = sorted({
+            ip for name, ips in self.servers_data.items() if name != server_name
+            for ip in ips.split(",")
+        } - set(self.servers_data[server_name].split(",")))
+        elements = ", ".join(blocked) if blocked else "127.255.255.255"
+        return (
+            "table inet cs2picker\n"
+            "delete table inet cs2picker\n"
+            "table inet cs2picker {\n"
+            f"    set blocked {{ type ipv4_addr; elements = {{ {elements} }} }}\n"
+            "    chain output {\n"
+            "        type filter hook output priority 0; policy accept;\n"
+            "        ip daddr @blocked reject\n"
+            "    }\n"
+            "}\n"
+        )
+    
+    async def probe(self, namespace, ip, count=None):
+        """Ping a relay from inside the namespace; returns the reply times in ms"""
+        count = count or self.plan["probe_count"]
+        timeout = self.plan["probe_timeout"]
+        _, stdout, _ = await self._run(
+            ["ip", "netns", "exec", namespace, "ping", "-n", "-c", str(count), "-W", str(timeout), ip],
+            timeout=count * (timeout + 1) + 5
+        )
+        return parse_ping_times(stdout)
+    
+    async def test_pop(self, server_name, slot):
+        """Switch a namespace to server_name and measure switch latency and reachability"""
+        namespace = self._names(slot)[0]
+        relays = self.servers_data[server_name].split(",")[:self.plan["max_relays"]]
+        result = {"server": server_name, "mode": "netns", "relays_probed": len(relays)}
+        loop = asyncio.get_running_loop()
+        
+        start = loop.time()
+        await self._check(["ip", "netns", "exec", namespace, "nft", "-f", "-"],
+                          input_text=self.build_ruleset(server_name))
+        result["apply_ms"] = round((loop.time() - start) * 1000, 1)
+        
+        # Switch latency runs from applying the rules until a relay of the POP first answers
+        result["switch_ms"] = None
+        for ip in relays:
+            if await self.probe(namespace, ip, count=1):
+                result["switch_ms"] = round((loop.time() - start) * 1000, 1)
+                break
+        
+        times = await asyncio.gather(*(self.probe(namespace, ip) for ip in relays))
+        result["relays_reachable"] = sum(1 for ip_times in times if ip_times)
+        all_times = [t for ip_times in times for t in ip_times]
+        result["median_rtt_ms"] = round(statistics.median(all_times), 1) if all_times else None
+        result["loss"] = round(
+            1 - len(all_times) / (len(relays) * self.plan["probe_count"]), 2
+        ) if relays else None
+        
+        if self.plan["verify_blocked"]:
+            other = next((name for name in self.servers_data if name != server_name), None)
+            if other is not None:
+                result["block_verified"] = not await self.probe(namespace, self.servers_data[other].split(",")[0], count=1)
+        return result
+    
+    async def run(self, pops):
+        """Test every POP, at most parallel at a time, and return one result per POP"""
+        with open(self.ip_forward_file, 'r') as f:
+            self.original_ip_forward = f.read().strip()
+        with open(self.ip_forward_file, 'w') as f:
+            f.write("1")
+        
+        slots = asyncio.Queue()
+        slot_count = min(self.parallel, len(pops))
+        try:
+            for slot in range(slot_count):
+                await self.setup_namespace(slot)
+                slots.put_nowait(slot)
+            
+            async def run_one(server_name):
+                slot = await slots.get()
+                try:
+                    logging.info(f"Testing {server_name} in namespace slot {slot}")
+                    print(f"Testing {server_name}...")
+                    return await self.test_pop(server_name, slot)
+                except Exception as e:
+                    logging.error(f"Error testing {server_name}: {str(e)}")
+                    return {"server": server_name, "mode": "netns", "error": str(e)}
+                finally:
+                    slots.put_nowait(slot)
+            
+            return await asyncio.gather(*(run_one(server_name) for server_name in pops))
+        finally:
+            for slot in range(slot_count):
+                await self.teardown_namespace(slot)
+            with open(self.ip_forward_file, 'w') as f:
+                f.write(self.original_ip_forward)
+
+
 class CS2TestServerManager:
     def __init__(self):
         self.api_url = "https://api.steampowered.com/ISteamApps/GetSDRConfig/v1/?appid=730"
         self.servers_data = {}
         self.preferred_servers = []
-        self.netsh_path = os.path.join(os.environ["SystemRoot"], "System32", "netsh.exe")
+        self.netsh_path = os.path.join(os.environ.get("SystemRoot", "C:\\Windows"), "System32", "netsh.exe")
         self.ahk_script_path = os.path.join(os.getcwd(), "cs2_automation.ahk")
         
         # Set up data directories
@@ -174,8 +387,12 @@ class CS2TestServerManager:
         
         return True
     
-    def run_ahk_script(self):
-        """Run the AutoHotkey script"""
+    def run_ahk_script(self, confirm=True, timeout=None):
+        """Run the AutoHotkey script (confirm=False skips the prompt for unattended runs).
+        
+        Returns True on success, False on failure, and None if the script was killed
+        after timeout seconds.
+        """
         try:
             logging.info("Running AHK script")
             print("\nRunning AHK script to navigate CS2 UI...")
@@ -189,15 +406,23 @@ class CS2TestServerManager:
             print("\nMake sure CS2 is already running to avoid anti-cheat issues.")
             
             # Ask for confirmation before proceeding
-            confirm = input("\nReady to proceed? (y/n): ").lower()
-            if confirm != 'y' and confirm != 'yes':
-                logging.info("User canceled AHK script execution")
-                print("AHK script execution canceled.")
-                return False
+            if confirm:
+                answer = input("\nReady to proceed? (y/n): ").lower()
+                if answer != 'y' and answer != 'yes':
+                    logging.info("User canceled AHK script execution")
+                    print("AHK script execution canceled.")
+                    return False
             
             ahk_executable = "C:\\Program Files\\AutoHotkey\\v2\\AutoHotkey.exe"
             print("\nLaunching AHK script...")
-            result = subprocess.run([ahk_executable, self.ahk_script_path], capture_output=True, text=True, encoding='utf-8')
+            try:
+                result = subprocess.run([ahk_executable, self.ahk_script_path], capture_output=True, text=True,
+                                        encoding='utf-8', timeout=timeout)
+            except subprocess.TimeoutExpired:
+                # subprocess.run has already killed the script
+                logging.warning(f"AHK script killed after {timeout} seconds")
+                print(f"AHK script killed after {timeout} seconds")
+                return None
             
             if result.returncode != 0:
                 logging.error(f"AHK script failed: {result.stderr}")
@@ -248,9 +473,162 @@ class CS2TestServerManager:
         self.run_ahk_script()
         
         return True
+    
+    def _ping_host(self, ip, count, timeout):
+        """Ping from the (Windows) host; returns the reply times in ms"""
+        cmd = ["ping", "-n", str(count), "-w", str(int(timeout * 1000)), ip]
+        try:
+            result = subprocess.run(cmd, capture_output=True, timeout=count * (timeout + 1) + 5)
+            return parse_ping_times(result.stdout.decode(console_encoding(), errors='replace'))
+        except Exception as e:
+            logging.error(f"Error pinging {ip}: {str(e)}")
+            return []
+    
+    def _run_host_test(self, server_name, plan):
+        """Test one POP through the host firewall (used where network namespaces are unavailable)"""
+        relays = self.servers_data[server_name].split(",")[:plan["max_relays"]]
+        result = {"server": server_name, "mode": "host", "relays_probed": len(relays)}
+        
+        start = time.monotonic()
+        self.unblock_server(server_name)
+        for name in self.servers_data:
+            if name != server_name:
+                self.block_server(name)
+        result["apply_ms"] = round((time.monotonic() - start) * 1000, 1)
+        
+        # Switch latency runs from the first rule change until a relay of the POP first answers
+        result["switch_ms"] = None
+        for ip in relays:
+            if self._ping_host(ip, 1, plan["probe_timeout"]):
+                result["switch_ms"] = round((time.monotonic() - start) * 1000, 1)
+                break
+        
+        times = [self._ping_host(ip, plan["probe_count"], plan["probe_timeout"]) for ip in relays]
+        result["relays_reachable"] = sum(1 for ip_times in times if ip_times)
+        all_times = [t for ip_times in times for t in ip_times]
+        result["median_rtt_ms"] = round(statistics.median(all_times), 1) if all_times else None
+        result["loss"] = round(1 - len(all_times) / (len(relays) * plan["probe_count"]), 2) if relays else None
+        
+        if plan["verify_blocked"]:
+            other = next((name for name in self.servers_data if name != server_name), None)
+            if other is not None:
+                result["block_verified"] = not self._ping_host(self.servers_data[other].split(",")[0], 1, plan["probe_timeout"])
+        
+        if plan["run_automation"]:
+            outcome = self.run_ahk_script(confirm=False, timeout=plan["automation_timeout"])
+            result["automation"] = {True: "ok", False: "failed", None: "timeout"}[outcome]
+        return result
+    
+    def run_batch_test(self, pops, plan=None, parallel=4):
+        """Test several POPs without prompts and produce one comparative report.
+        
+        On Linux (as root) each POP is tested in its own network namespace with a
+        namespace-local firewall, up to `parallel` at a time. On Windows the POPs are
+        tested one after another on the host firewall, which is unblocked afterwards.
+        Anywhere else no firewall can be applied, so no test is run and None is returned.
+        
+        Args:
+            pops: Server names to test
+            plan: Overrides for DEFAULT_TEST_PLAN
+            parallel: Number of POPs tested at once in namespace mode
+        """
+        use_namespaces = sys.platform.startswith("linux") and hasattr(os, "geteuid") and os.geteuid() == 0
+        if not use_namespaces and sys.platform != "win32":
+            logging.error("Batch test needs network namespaces (Linux, as root) or the Windows firewall")
+            print("Batch test needs network namespaces (run as root on Linux) or the Windows firewall. "
+                  "No firewall rules could be applied here, so no servers were tested.")
+            return None
+        
+        plan = dict(DEFAULT_TEST_PLAN, **(plan or {}))
+        started = datetime.now()
+        
+        results = []
+        known_pops = []
+        for server_name in pops:
+            if server_name in self.servers_data:
+                known_pops.append(server_name)
+            else:
+                logging.error(f"Server not found in data: {server_name}")
+                print(f"Server not found in data: {server_name}")
+                results.append({"server": server_name, "error": "not in server data"})
+        
+        logging.info(f"Running batch test of {len(known_pops)} servers "
+                     f"({'network namespaces, ' + str(parallel) + ' in parallel' if use_namespaces else 'host firewall'})")
+        print(f"Running batch test of {len(known_pops)} servers...")
+        
+        if use_namespaces:
+            runner = NamespaceTestRunner(self.servers_data, plan, parallel)
+            results.extend(asyncio.run(runner.run(known_pops)))
+        else:
+            if parallel > 1:
+                print("Network namespaces unavailable, testing one server at a time on the host firewall")
+            try:
+                for server_name in known_pops:
+                    print(f"Testing {server_name}...")
+                    results.append(self._run_host_test(server_name, plan))
+            finally:
+                self.unblock_all_servers()
+        
+        report = {
+            "started": started.isoformat(timespec="seconds"),
+            "duration_seconds": round((datetime.now() - started).total_seconds(), 1),
+            "mode": "netns" if use_namespaces else "host",
+            "parallel": parallel if use_namespaces else 1,
+            "plan": plan,
+            "results": results,
+        }
+        self.print_batch_report(report)
+        self.save_batch_report(report)
+        return report
+    
+    def print_batch_report(self, report):
+        """Print the batch results, best reachability and fastest switch first"""
+        def sort_key(result):
+            switch = result.get("switch_ms")
+            return (-result.get("relays_reachable", -1), switch if switch is not None else float("inf"))
+        
+        print(f"\nBatch test report ({report['mode']} mode, {report['duration_seconds']}s)")
+        header = (f"{'Server':<45} {'Reach':>7} {'Switch ms':>10} {'RTT ms':>8} {'Loss':>6} "
+                  f"{'Blocked':>8} {'Automation':>10}")
+        print(header)
+        print("-" * len(header))
+        for result in sorted(report["results"], key=sort_key):
+            if "error" in result:
+                print(f"{result['server']:<45} error: {result['error']}")
+                continue
+            reach = f"{result['relays_reachable']}/{result['relays_probed']}"
+            blocked = {True: "ok", False: "LEAK"}.get(result.get("block_verified"), "-")
+            print(f"{result['server']:<45} {reach:>7} {str(result['switch_ms']):>10} "
+                  f"{str(result['median_rtt_ms']):>8} {str(result['loss']):>6} {blocked:>8} "
+                  f"{result.get('automation', '-'):>10}")
+    
+    def save_batch_report(self, report):
+        """Save the batch report as JSON in the data directory"""
+        report_file = os.path.join(
+            self.data_directory, f"batch_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        try:
+            with open(report_file, "w") as f:
+                json.dump(report, f, indent=4)
+            logging.info(f"Batch test report saved: {report_file}")
+            print(f"\nReport saved: {report_file}")
+        except Exception as e:
+            logging.error(f"Error saving batch test report: {str(e)}")
+            print(f"Error saving batch test report: {str(e)}")
+        return report_file
 
 # Main execution
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Test CS2 server selection interactively or in batch")
+    parser.add_argument("--batch", action="store_true", help="test several servers without prompts")
+    parser.add_argument("--pops", help="';'-separated server names to test (default: preferred servers)")
+    parser.add_argument("--all", action="store_true", help="batch test every server in the data")
+    parser.add_argument("--parallel", type=int, default=4, help="servers tested at once in namespace mode")
+    parser.add_argument("--plan", help="JSON file overriding the default test plan")
+    args = parser.parse_args()
+    
     try:
         print("=== CS2 Test Server Manager ===")
         print(f"Current time: {datetime.now()}")
@@ -266,6 +644,27 @@ if __name__ == "__main__":
             print("Failed to fetch server data. Exiting.")
             sys.exit(1)
         
+        if args.batch:
+            if args.all:
+                pops = list(manager.servers_data)
+            elif args.pops:
+                pops = [name.strip() for name in args.pops.split(";") if name.strip()]
+            else:
+                pops = manager.preferred_servers
+            if not pops:
+                print("No servers to test. Use --pops, --all or add preferred servers.")
+                sys.exit(1)
+            
+            plan = None
+            if args.plan:
+                with open(args.plan, 'r') as f:
+                    plan = json.load(f)
+            
+            report = manager.run_batch_test(pops, plan, args.parallel)
+            if report is None:
+                sys.exit(1)
+            sys.exit(0 if all("error" not in result for result in report["results"]) else 1)
+        
         # If no preferred servers defined, create an example file
         if not manager.preferred_servers:
             print("No preferred servers found. Creating example file...")
@@ -0,0 +1,51 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from server_snapshot import HEADER, ServerSnapshot, build_snapshot, content_version, write_snapshot
+
+SERVERS = {
+    "Frankfurt (Germany) (fra)": "155.133.226.68,155.133.226.69,162.254.197.36",
+    "Vienna (Austria) (vie)": "146.66.155.66,146.66.155.67",
+}
+
+
+class ServerSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "all_servers.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        write_snapshot(self.path, SERVERS)
+        with ServerSnapshot(self.path) as snapshot:
+            self.assertEqual(snapshot.to_servers_data(), SERVERS)
+            self.assertEqual(snapshot.version, content_version(SERVERS))
+            self.assertEqual(snapshot.lookup("155.133.226.69"), "Frankfurt (Germany) (fra)")
+            self.assertIsNone(snapshot.lookup("155.133.226.70"))
+            self.assertEqual(snapshot.find("Vienna (Austria) (vie)"), 1)
+            self.assertEqual(snapshot.find("Nowhere (x)"), -1)
+
+    def test_close_while_a_view_is_held(self):
+        write_snapshot(self.path, SERVERS)
+        with ServerSnapshot(self.path) as snapshot:
+            ips = snapshot.ip_values(snapshot.find("Vienna (Austria) (vie)"))
+        self.assertEqual(len(ips), 2)
+
+    def test_corrupt_section_offset(self):
+        data = bytearray(build_snapshot(SERVERS))
+        # The header ends with nine section offsets; point the second (ips) past the end of the file
+        ips_offset_position = HEADER.size - 9 * 4 + 4
+        struct.pack_into("<I", data, ips_offset_position, len(data))
+        with open(self.path, "wb") as f:
+            f.write(data)
+        with self.assertRaises(ValueError):
+            ServerSnapshot(self.path)
+
+
+# Main execution
+if __name__ == "__main__":
+    unittest.main()